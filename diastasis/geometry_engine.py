@@ -1,12 +1,14 @@
 import logging
 import multiprocessing
 from itertools import combinations
-from typing import Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import numpy as np
 import shapely
 from rtree import index
 from shapely.geometry import Polygon
+from shapely.geometry.base import BaseGeometry
+from shapely.prepared import PreparedGeometry, prep
 from shapely.strtree import STRtree
 from shapely.validation import make_valid
 
@@ -17,48 +19,122 @@ logger = logging.getLogger(__name__)
 VALID_TOUCH_POLICIES = ("any_touch", "edge_or_overlap")
 
 
-def check_and_calculate_overlap_worker(shapes_pair: Tuple[int, int, Polygon, Polygon]) -> Tuple[int, int, float]:
-    """Worker function to check for overlap and calculate the area."""
-    i, j, shape1_geom, shape2_geom = shapes_pair
-    if shape1_geom.intersects(shape2_geom):
-        overlap_area = shape1_geom.intersection(shape2_geom).area
-        if overlap_area > 0:
-            return (i, j, overlap_area)
-    return None
+# Per-process geometry table, filled once by the pool initializer so tasks
+# only carry index arrays.
+_worker_geometries = None
+
+
+def _init_overlap_worker(geometries_wkb: np.ndarray) -> None:
+    global _worker_geometries
+    _worker_geometries = shapely.from_wkb(geometries_wkb)
+
+
+def overlap_batch_worker(pairs: Tuple[np.ndarray, np.ndarray]) -> List[Tuple[int, int, float]]:
+    """
+    Worker function: compute the overlap area of every (left[k], right[k])
+    pair in one vectorized GEOS call against the worker's geometry table.
+    """
+    left, right = pairs
+    areas = shapely.area(shapely.intersection(_worker_geometries[left], _worker_geometries[right]))
+    keep = areas > 0
+    return list(zip(left[keep].tolist(), right[keep].tolist(), areas[keep].tolist()))
+
+
+def _upper_triangle_chunks(n: int, pairs_per_chunk: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Lazily yield the (i, j), i < j index pairs of n items as array chunks of
+    whole rows holding roughly pairs_per_chunk pairs each, so the full
+    n(n-1)/2 pair list never exists in memory at once.
+    """
+    start = 0
+    pending = 0
+    for row in range(n - 1):
+        pending += n - 1 - row
+        if pending < pairs_per_chunk and row < n - 2:
+            continue
+        rows = np.arange(start, row + 1)
+        left = np.repeat(rows, n - 1 - rows)
+        right = np.concatenate([np.arange(i + 1, n) for i in rows])
+        yield left, right
+        start = row + 1
+        pending = 0
 
 
 class GeometryEngine:
-    def __init__(self, use_spatial_index=True, max_workers=None):
+    # Up to this many shapes the rtree uses small nodes (a shallow tree with
+    # little fanout per query); larger inputs get wider nodes.
+    SMALL_INDEX_SHAPES = 1000
+    # Without the spatial index, all-pairs bbox filtering runs over row
+    # blocks of about this many pairs, so the full pair list never exists.
+    BBOX_FILTER_PAIRS_PER_CHUNK = 1_000_000
+
+    def __init__(self, use_spatial_index=True, max_workers=None, rtree_properties=None):
         self.use_spatial_index = use_spatial_index
         self.max_workers = max_workers if max_workers else multiprocessing.cpu_count()
+        # Optional overrides for rtree.index.Property, e.g.
+        # {"leaf_capacity": 32, "index_capacity": 32, "fill_factor": 0.8}.
+        self.rtree_properties = dict(rtree_properties or {})
         self.idx = None
+        # (N, 4) minx/miny/maxx/maxy of the last indexed shapes.
+        self._bounds: np.ndarray = np.empty((0, 4))
+        # id(geometry) -> (geometry, sanitized geometry); holding the source
+        # geometry keeps its id from being reused while the entry exists.
+        self._clean: Dict[int, Tuple[BaseGeometry, BaseGeometry]] = {}
 
     def build_spatial_index(self, shapes: List[Shape]):
-        """Builds a spatial index for the given shapes."""
+        """
+        Builds a spatial index for the given shapes. The tree is STR
+        bulk-loaded in one pass, which packs nodes far tighter than
+        one-by-one inserts and so prunes queries better.
+        """
         if not self.use_spatial_index:
             return
-        self.idx = index.Index()
-        for i, shape in enumerate(shapes):
-            self.idx.insert(i, shape.geometry.bounds)
+        # Bounds are cached so candidate queries don't re-read them from GEOS,
+        # and geometries are repaired once here so pair checks hit the cache.
+        self._bounds = self._shape_bounds(shapes)
+        self._sanitized_geometry_array(shapes)
+        properties = self._rtree_property(len(shapes))
+        if not len(self._bounds):
+            # The bulk loader rejects an empty stream.
+            self.idx = index.Index(properties=properties)
+            return
+        stream = ((i, bounds, None) for i, bounds in enumerate(self._bounds.tolist()))
+        self.idx = index.Index(stream, properties=properties)
+
+    def _rtree_property(self, count: int) -> index.Property:
+        """rtree node sizing for count shapes, with user overrides applied."""
+        capacity = 16 if count <= self.SMALL_INDEX_SHAPES else 64
+        settings = {"leaf_capacity": capacity, "index_capacity": capacity, "fill_factor": 0.9}
+        settings.update(self.rtree_properties)
+        return index.Property(**settings)
 
     def detect_overlaps(self, shapes: List[Shape]) -> List[Tuple[int, int, float]]:
         """Detects all pairs of overlapping shapes and their overlap area."""
-        if not self.use_spatial_index:
-            return self.parallel_overlap_detection(shapes)
-        if len(shapes) < 2:
-            return []
-        try:
-            return self._detect_overlaps_vectorized(shapes)
-        except Exception as exc:
-            logger.warning(
-                "Vectorized overlap detection failed, falling back to pairwise: %s",
-                exc, exc_info=True,
-            )
-            return self._detect_overlaps_pairwise(shapes)
+        return self._detect_overlaps_core(shapes, need_area=True)
 
     def detect_overlap_pairs(self, shapes: List[Shape]) -> List[Tuple[int, int]]:
-        """Detect overlap adjacency pairs without keeping overlap areas."""
-        return [(i, j) for i, j, _ in self.detect_overlaps(shapes)]
+        """Detect overlap adjacency pairs without computing overlap areas."""
+        return self._detect_overlaps_core(shapes, need_area=False)
+
+    def _detect_overlaps_core(self, shapes: List[Shape], need_area: bool) -> list:
+        """
+        Single overlap pass behind detect_overlaps and detect_overlap_pairs.
+        Returns (i, j, area) triples, or (i, j) pairs when need_area is False.
+        """
+        if not self.use_spatial_index:
+            overlaps = self.parallel_overlap_detection(shapes)
+        elif len(shapes) < 2:
+            return []
+        else:
+            try:
+                return self._detect_overlaps_vectorized(shapes, need_area=need_area)
+            except Exception as exc:
+                logger.warning(
+                    "Vectorized overlap detection failed, falling back to pairwise: %s",
+                    exc, exc_info=True,
+                )
+                overlaps = self._detect_overlaps_pairwise(shapes)
+        return overlaps if need_area else [(i, j) for i, j, _ in overlaps]
 
     def detect_contacts(self, shapes: List[Shape], touch_policy: str = "any_touch") -> List[Tuple[int, int]]:
         """
@@ -84,23 +160,43 @@ class GeometryEngine:
             )
             return self._detect_contacts_pairwise(shapes, touch_policy)
 
-    def _detect_overlaps_vectorized(self, shapes: List[Shape]) -> List[Tuple[int, int, float]]:
+    def _detect_overlaps_vectorized(self, shapes: List[Shape], need_area: bool = True) -> list:
         """
-        Bulk overlap detection: one STRtree query for all candidate pairs,
-        then vectorized intersection/area over the candidates.
+        Bulk overlap detection: one bbox-only STRtree query for all candidate
+        pairs, then vectorized intersection/area over the candidates. No
+        intersects predicate is run first: disjoint pairs simply come back
+        with an empty intersection and zero area. Without need_area, no
+        intersection geometry is built: a pair overlaps when the interiors
+        meet in two dimensions (DE-9IM "2********"), which is exactly the
+        area > 0 test.
         """
         geometries = self._sanitized_geometry_array(shapes)
-        left, right = self._candidate_pair_arrays(geometries)
+        left, right = self._candidate_pair_arrays(geometries, predicate=None)
         if left.size == 0:
             return []
 
-        intersections = shapely.intersection(geometries[left], geometries[right])
-        areas = shapely.area(intersections)
+        box_pairs, widths, heights = self._box_pair_extents(geometries, left, right)
+        if not need_area:
+            keep = np.empty(left.size, dtype=bool)
+            keep[box_pairs] = (widths > 0) & (heights > 0)
+            general = ~box_pairs
+            if general.any():
+                keep[general] = shapely.relate_pattern(
+                    geometries[left[general]], geometries[right[general]], "2********"
+                )
+            return list(zip(left[keep].tolist(), right[keep].tolist()))
+
+        areas = np.empty(left.size, dtype=np.float64)
+        # Rectangle pairs overlap in closed form; only the rest go to GEOS.
+        areas[box_pairs] = widths * heights
+        general = ~box_pairs
+        if general.any():
+            areas[general] = shapely.area(
+                shapely.intersection(geometries[left[general]], geometries[right[general]])
+            )
         keep = areas > 0
-        return [
-            (int(i), int(j), float(area))
-            for i, j, area in zip(left[keep], right[keep], areas[keep])
-        ]
+        # tolist() converts to Python scalars in C rather than per element.
+        return list(zip(left[keep].tolist(), right[keep].tolist(), areas[keep].tolist()))
 
     def _detect_contacts_vectorized(self, shapes: List[Shape], touch_policy: str) -> List[Tuple[int, int]]:
         geometries = self._sanitized_geometry_array(shapes)
@@ -110,23 +206,78 @@ class GeometryEngine:
 
         if touch_policy == "any_touch":
             # The candidate query already used the intersects predicate.
-            return [(int(i), int(j)) for i, j in zip(left, right)]
+            return list(zip(left.tolist(), right.tolist()))
 
         # Corner-only contacts have zero area and zero length and are allowed.
-        intersections = shapely.intersection(geometries[left], geometries[right])
-        keep = (shapely.area(intersections) > 0) | (shapely.length(intersections) > 0)
-        return [(int(i), int(j)) for i, j in zip(left[keep], right[keep])]
+        # For two touching rectangles that means both overlap extents are zero.
+        box_pairs, widths, heights = self._box_pair_extents(geometries, left, right)
+        keep = np.empty(left.size, dtype=bool)
+        keep[box_pairs] = (widths > 0) | (heights > 0)
+        general = ~box_pairs
+        if general.any():
+            # Classify from the DE-9IM matrix instead of building intersection
+            # geometries: a pair conflicts when any interior/boundary cell has
+            # dimension 1 or 2, i.e. the shapes share more than isolated points.
+            matrices = shapely.relate(geometries[left[general]], geometries[right[general]])
+            cells = matrices.astype("U9").view("U1").reshape(-1, 9)[:, [0, 1, 3, 4]]
+            keep[general] = np.isin(cells, ("1", "2")).any(axis=1)
+        return list(zip(left[keep].tolist(), right[keep].tolist()))
+
+    def _box_pair_extents(
+        self, geometries: np.ndarray, left: np.ndarray, right: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find candidate pairs where both geometries are axis-aligned
+        rectangles (plain SVG <rect>s are the common case) and return
+        (mask, widths, heights) of their bounding-box overlap, which for
+        such pairs is exactly their intersection.
+        """
+        bounds = shapely.bounds(geometries)
+        bbox_areas = (bounds[:, 2] - bounds[:, 0]) * (bounds[:, 3] - bounds[:, 1])
+        # A polygon that fills its whole bounding box is that box.
+        is_box = (
+            (shapely.get_type_id(geometries) == shapely.GeometryType.POLYGON)
+            & (bbox_areas > 0)
+            & np.isclose(shapely.area(geometries), bbox_areas, rtol=1e-12, atol=0.0)
+        )
+        box_pairs = is_box[left] & is_box[right]
+        box_left, box_right = bounds[left[box_pairs]], bounds[right[box_pairs]]
+        widths = np.maximum(
+            0.0, np.minimum(box_left[:, 2], box_right[:, 2]) - np.maximum(box_left[:, 0], box_right[:, 0])
+        )
+        heights = np.maximum(
+            0.0, np.minimum(box_left[:, 3], box_right[:, 3]) - np.maximum(box_left[:, 1], box_right[:, 1])
+        )
+        return box_pairs, widths, heights
 
     def _sanitized_geometry_array(self, shapes: List[Shape]) -> np.ndarray:
-        geometries = np.empty(len(shapes), dtype=object)
-        for i, shape in enumerate(shapes):
-            geometries[i] = self._sanitize_geometry(shape.geometry)
+        """
+        Sanitized geometries as an object array. Uncached geometries are
+        validated in one shapely.is_valid batch, so only the invalid ones
+        pay for a per-geometry repair.
+        """
+        geometries = np.fromiter((shape.geometry for shape in shapes), dtype=object, count=len(shapes))
+        unseen = np.fromiter(
+            (id(geom) not in self._clean for geom in geometries), dtype=bool, count=len(geometries)
+        )
+        if unseen.any():
+            fresh = geometries[unseen]
+            for geom, valid in zip(fresh.tolist(), shapely.is_valid(fresh).tolist()):
+                if valid:
+                    self._clean.setdefault(id(geom), (geom, geom))
+        for i, geom in enumerate(geometries.tolist()):
+            geometries[i] = self._sanitize_geometry(geom)
         return geometries
 
-    def _candidate_pair_arrays(self, geometries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        """One bulk STRtree query for all intersecting pairs (i < j)."""
+    def _candidate_pair_arrays(
+        self, geometries: np.ndarray, predicate: Optional[str] = "intersects"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        One bulk STRtree query for all pairs (i < j) matching predicate,
+        or for all bounding-box overlaps when predicate is None.
+        """
         tree = STRtree(geometries)
-        left, right = tree.query(geometries, predicate="intersects")
+        left, right = tree.query(geometries, predicate=predicate)
         keep = left < right
         return left[keep], right[keep]
 
@@ -138,10 +289,8 @@ class GeometryEngine:
         if len(shapes) < 2:
             return 0
         try:
-            geometries = self._sanitized_geometry_array(shapes)
-            tree = STRtree(geometries)
-            left, right = tree.query(geometries)  # bbox-only, no predicate
-            return int(np.count_nonzero(left < right))
+            left, _ = self._candidate_pair_arrays(self._sanitized_geometry_array(shapes), predicate=None)
+            return int(left.size)
         except Exception as exc:
             logger.warning("Vectorized candidate counting failed, falling back: %s", exc)
             return sum(1 for _ in self._candidate_pairs(shapes))
@@ -149,37 +298,64 @@ class GeometryEngine:
     def _detect_overlaps_pairwise(self, shapes: List[Shape]) -> List[Tuple[int, int, float]]:
         """Per-pair fallback used when the vectorized path fails."""
         overlaps = []
-        for i, j in self._candidate_pairs(shapes):
-            shape1 = shapes[i]
-            shape2 = shapes[j]
-            if self._bounds_intersect(shape1.geometry.bounds, shape2.geometry.bounds):
-                g1 = self._sanitize_geometry(shape1.geometry)
-                g2 = self._sanitize_geometry(shape2.geometry)
-                if g1.intersects(g2):
-                    overlap_area = g1.intersection(g2).area
-                    if overlap_area > 0:
-                        overlaps.append((i, j, overlap_area))
+        for i, j, prepared1, g1, g2 in self._prepared_pairs(shapes):
+            if prepared1.intersects(g2):
+                # Prepared geometries only answer predicates; overlay needs g1.
+                overlap_area = g1.intersection(g2).area
+                if overlap_area > 0:
+                    overlaps.append((i, j, overlap_area))
         return overlaps
 
     def _detect_contacts_pairwise(self, shapes: List[Shape], touch_policy: str) -> List[Tuple[int, int]]:
         contacts = []
-        for i, j in self._candidate_pairs(shapes):
-            shape1 = shapes[i]
-            shape2 = shapes[j]
-            if self._bounds_intersect(shape1.geometry.bounds, shape2.geometry.bounds) and self._is_contact_conflict(
-                shape1.geometry, shape2.geometry, touch_policy
-            ):
+        for i, j, prepared1, g1, g2 in self._prepared_pairs(shapes):
+            if self._is_contact_conflict(g1, g2, touch_policy, prepared1=prepared1):
                 contacts.append((i, j))
         return contacts
 
-    def parallel_overlap_detection(self, shapes: List[Shape]) -> List[Tuple[int, int, float]]:
-        """Detects overlaps in parallel and calculates their area."""
-        shape_pairs = [(i, j, shapes[i].geometry, shapes[j].geometry) for i, j in combinations(range(len(shapes)), 2)]
+    def _prepared_pairs(
+        self, shapes: List[Shape]
+    ) -> Iterator[Tuple[int, int, PreparedGeometry, Polygon, Polygon]]:
+        """
+        Yield bbox-filtered candidate pairs as (i, j, prepared g_i, g_i, g_j)
+        with sanitized geometries. Pairs arrive grouped by i, so each left
+        geometry is prepared once and reused against all of its partners.
+        """
+        left, right = self._bbox_filtered_pairs(shapes)
+        prepared_index, prepared1, g1 = -1, None, None
+        for i, j in zip(left.tolist(), right.tolist()):
+            if i != prepared_index:
+                g1 = self._sanitize_geometry(shapes[i].geometry)
+                prepared_index, prepared1 = i, prep(g1)
+            yield i, j, prepared1, g1, self._sanitize_geometry(shapes[j].geometry)
 
-        with multiprocessing.Pool(processes=self.max_workers) as pool:
-            results = pool.map(check_and_calculate_overlap_worker, shape_pairs)
+    def parallel_overlap_detection(self, shapes: List[Shape]) -> List[Tuple[int, int, float]]:
+        """
+        Detects overlaps in parallel and calculates their area.
 
-        return [res for res in results if res is not None]
+        Geometries are shipped to each worker once, as WKB (far cheaper to
+        pickle than shapely objects), and the all-pairs index arrays are
+        streamed to the pool in chunks evaluated with vectorized shapely calls.
+        """
+        if len(shapes) < 2:
+            return []
+        geometries_wkb = shapely.to_wkb(self._sanitized_geometry_array(shapes))
+        num_pairs = len(shapes) * (len(shapes) - 1) // 2
+        pairs_per_chunk = max(1, num_pairs // (8 * self.max_workers))
+
+        with multiprocessing.Pool(
+            processes=self.max_workers,
+            initializer=_init_overlap_worker,
+            initargs=(geometries_wkb,),
+        ) as pool:
+            # imap keeps results in pair order while chunks are produced lazily.
+            return [
+                overlap
+                for chunk_result in pool.imap(
+                    overlap_batch_worker, _upper_triangle_chunks(len(shapes), pairs_per_chunk)
+                )
+                for overlap in chunk_result
+            ]
 
     def calculate_overlap_area(self, shape1: Shape, shape2: Shape) -> float:
         """Calculates the overlap area between two shapes."""
@@ -195,30 +371,81 @@ class GeometryEngine:
         """
         if not self.use_spatial_index:
             return combinations(range(len(shapes)), 2)
+        left, right = self._candidate_pair_indices(shapes)
+        return zip(left.tolist(), right.tolist())
 
+    def _candidate_pair_indices(self, shapes: List[Shape]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Spatial-index candidate pairs (i < j) as index arrays sorted by
+        (i, j). Index hits are packed into uint64 keys and deduplicated with
+        one np.unique sort instead of hashing a Python tuple per pair.
+        """
         self.build_spatial_index(shapes)
-        seen = set()
-        for i, shape in enumerate(shapes):
-            for j in self.idx.intersection(shape.geometry.bounds):
-                if j <= i:
-                    continue
-                key = (i, j)
-                if key not in seen:
-                    seen.add(key)
-                    yield key
-
-    def _bounds_intersect(self, b1, b2) -> bool:
-        return not (b1[2] < b2[0] or b2[2] < b1[0] or b1[3] < b2[1] or b2[3] < b1[1])
-
-    def _is_contact_conflict(self, geom1: Polygon, geom2: Polygon, touch_policy: str) -> bool:
+        hits = [
+            np.fromiter(self.idx.intersection(bounds), dtype=np.uint64)
+            for bounds in self._bounds.tolist()
+        ]
+        counts = np.fromiter((len(row) for row in hits), dtype=np.intp, count=len(hits))
+        left = np.repeat(np.arange(len(hits), dtype=np.uint64), counts)
+        right = np.concatenate(hits) if hits else np.empty(0, dtype=np.uint64)
+        keys = np.unique((left << np.uint64(32)) | right)
+        left = (keys >> np.uint64(32)).astype(np.intp)
+        right = (keys & np.uint64(0xFFFFFFFF)).astype(np.intp)
+        keep = left < right
+        return left[keep], right[keep]
+
+    def _bbox_filtered_pairs(self, shapes: List[Shape]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Candidate pairs whose bounding boxes overlap, tested a block of
+        pairs at a time with NumPy comparisons instead of a per-pair check.
+        """
+        if self.use_spatial_index:
+            chunks = [self._candidate_pair_indices(shapes)]
+            # The spatial index has just cached these bounds.
+            bounds = self._bounds
+        else:
+            # All pairs, generated lazily in row blocks rather than as one
+            # n(n-1)/2 array pair.
+            chunks = _upper_triangle_chunks(len(shapes), self.BBOX_FILTER_PAIRS_PER_CHUNK)
+            bounds = self._shape_bounds(shapes)
+
+        kept_left, kept_right = [], []
+        for left, right in chunks:
+            overlapping = ~(
+                (bounds[left, 2] < bounds[right, 0])
+                | (bounds[right, 2] < bounds[left, 0])
+                | (bounds[left, 3] < bounds[right, 1])
+                | (bounds[right, 3] < bounds[left, 1])
+            )
+            kept_left.append(left[overlapping])
+            kept_right.append(right[overlapping])
+        if not kept_left:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty
+        return np.concatenate(kept_left), np.concatenate(kept_right)
+
+    @staticmethod
+    def _shape_bounds(shapes: List[Shape]) -> np.ndarray:
+        """Bounds of all shapes as an (N, 4) array, read from GEOS in one call."""
+        geometries = np.fromiter((shape.geometry for shape in shapes), dtype=object, count=len(shapes))
+        return shapely.bounds(geometries).reshape(-1, 4)
+
+    def _is_contact_conflict(
+        self,
+        geom1: Polygon,
+        geom2: Polygon,
+        touch_policy: str,
+        prepared1: Optional[PreparedGeometry] = None,
+    ) -> bool:
         geom1 = self._sanitize_geometry(geom1)
         geom2 = self._sanitize_geometry(geom2)
+        predicate_geom = prepared1 if prepared1 is not None else geom1
 
         # Fast path for the default policy: any contact is a conflict.
         if touch_policy == "any_touch":
-            return geom1.intersects(geom2)
+            return predicate_geom.intersects(geom2)
 
-        if not geom1.intersects(geom2):
+        if not predicate_geom.intersects(geom2):
             return False
 
         intersection = geom1.intersection(geom2)
@@ -233,6 +460,17 @@ class GeometryEngine:
         return True
 
     def _sanitize_geometry(self, geom: Polygon) -> Polygon:
+        """Memoized _repair_geometry: each geometry is validated at most once."""
+        cached = self._clean.get(id(geom))
+        if cached is not None:
+            return cached[1]
+        repaired = self._repair_geometry(geom)
+        self._clean[id(geom)] = (geom, repaired)
+        # A repaired geometry is already clean; re-sanitizing it is a lookup.
+        self._clean.setdefault(id(repaired), (repaired, repaired))
+        return repaired
+
+    def _repair_geometry(self, geom: Polygon) -> Polygon:
         if geom.is_valid:
             return geom
         try:
@@ -4,9 +4,49 @@ from typing import Dict, List, Optional, Set, Tuple
 
 import networkx as nx
 import numpy as np
+import shapely
 
 from .svg_parser import Shape
 
+try:
+    from numba import njit
+except ImportError:  # numba is an optional speed-up (the "speed" extra)
+    njit = None
+
+
+def _force_k_assign_loops(indptr, indices, weights, order, k):
+    """
+    force_k greedy core over CSR arrays, written as plain loops for numba:
+    each position in order joins the layer with the least overlap weight
+    to its already-placed neighbors. Returns the layer of every position.
+    """
+    layer_of = np.full(indptr.shape[0] - 1, -1, dtype=np.int64)
+    costs = np.zeros(k, dtype=np.float64)
+    for u in order:
+        costs[:] = 0.0
+        for e in range(indptr[u], indptr[u + 1]):
+            layer = layer_of[indices[e]]
+            if layer >= 0:
+                costs[layer] += weights[e]
+        layer_of[u] = np.argmin(costs)
+    return layer_of
+
+
+def _force_k_assign_numpy(indptr, indices, weights, order, k):
+    """Same result as _force_k_assign_loops, scoring each node with one bincount."""
+    layer_of = np.full(indptr.shape[0] - 1, -1, dtype=np.int64)
+    for u in order.tolist():
+        start, end = indptr[u], indptr[u + 1]
+        neighbor_layers = layer_of[indices[start:end]]
+        assigned = neighbor_layers >= 0
+        # Cost of each layer = total overlap weight with neighbors already on it.
+        costs = np.bincount(neighbor_layers[assigned], weights=weights[start:end][assigned], minlength=k)
+        layer_of[u] = costs.argmin()
+    return layer_of
+
+
+_force_k_assign = njit(cache=True)(_force_k_assign_loops) if njit is not None else _force_k_assign_numpy
+
 
 class _ExactSearchBudgetExhausted(Exception):
     """Raised internally when the exact solver runs out of its step budget."""
@@ -34,21 +74,30 @@ class GraphSolver:
     HUGE_GRAPH_EDGES = 500_000
     # Exact search is only attempted on graphs small enough to finish quickly.
     EXACT_NODE_LIMIT = 70
+    # Max-clique search lists maximal cliques (Bron-Kerbosch) up to this edge
+    # density and uses max_weight_clique's branch and bound above it.
+    SPARSE_CLIQUE_DENSITY = 0.05
     EXACT_STEP_BUDGET = 200_000
 
     def build_overlap_graph(self, shapes: List[Shape], overlaps: List[Tuple[int, int, float]]) -> nx.Graph:
         """Builds a graph where nodes are shapes and edges represent overlaps with weights."""
         graph = nx.Graph()
-        for i in range(len(shapes)):
-            graph.add_node(i, size=shapes[i].geometry.area) # Add node size for sorting
-
-        for i, j, overlap_area in overlaps:
-            graph.add_edge(i, j, weight=overlap_area)
+        # Node sizes drive the size-descending order used by force_k.
+        geometries = np.fromiter((shape.geometry for shape in shapes), dtype=object, count=len(shapes))
+        areas = shapely.area(geometries)
+        graph.add_nodes_from((i, {"size": area}) for i, area in enumerate(areas.tolist()))
+        graph.add_weighted_edges_from(overlaps)
 
         return graph
 
     def solve_coloring(
-        self, graph: nx.Graph, algorithm: str = "minimum_layers", use_optimizer: bool = False, num_layers: int = None
+        self,
+        graph: nx.Graph,
+        algorithm: str = "minimum_layers",
+        use_optimizer: bool = False,
+        num_layers: Optional[int] = None,
+        progress_callback=None,
+        lower_bound: Optional[int] = None,
     ) -> Dict[int, int]:
         """
         Colors the graph using the specified algorithm.
@@ -59,6 +108,10 @@ class GraphSolver:
             algorithm: The coloring strategy to use.
             use_optimizer: If True, applies a local search optimization.
             num_layers: The target number of layers for 'force_k' algorithm.
+            progress_callback: Optional callable taking the fraction (0-1) of
+                the 'minimum_layers' search done, called between its phases.
+            lower_bound: A clique bound the caller already computed for this
+                graph; 'minimum_layers' then skips its own clique search.
 
         Returns:
             A dictionary mapping node IDs to their assigned color (layer).
@@ -76,7 +129,7 @@ class GraphSolver:
 
         if algorithm == "minimum_layers":
             # Refinement is built in, so use_optimizer adds nothing here.
-            return self.solve_minimum_coloring(graph)
+            return self.solve_minimum_coloring(graph, progress_callback, lower_bound=lower_bound)
 
         # Use the highly optimized greedy_color function from NetworkX.
         # Some strategies (notably deep DFS traversals) may hit Python recursion
@@ -94,12 +147,20 @@ class GraphSolver:
 
         return coloring
 
-    def solve_minimum_coloring(self, graph: nx.Graph) -> Dict[int, int]:
+    def solve_minimum_coloring(
+        self, graph: nx.Graph, progress_callback=None, lower_bound: Optional[int] = None
+    ) -> Dict[int, int]:
         """
         Best-effort minimum coloring: portfolio of greedy strategies with
         interchange, iterated-greedy refinement, and an exact branch-and-bound
         pass on small graphs. Stops as soon as a proven lower bound is met.
+        progress_callback(fraction), if given, is called after each phase.
+        A precomputed clique lower_bound for the graph may be passed in.
         """
+        def report(fraction):
+            if progress_callback is not None:
+                progress_callback(fraction)
+
         if graph.number_of_nodes() == 0:
             return {}
         if graph.number_of_edges() == 0:
@@ -116,8 +177,11 @@ class GraphSolver:
             or graph.number_of_edges() > self.LARGE_GRAPH_EDGES
         )
 
-        lower_bound = self.clique_lower_bound(graph)
+        if lower_bound is None:
+            lower_bound = self.clique_lower_bound(graph)
+        report(0.3)
         best = self._portfolio_coloring(graph, lower_bound)
+        report(0.6)
 
         if self.get_num_layers(best) > lower_bound:
             best = self._iterated_greedy_refine(
@@ -127,6 +191,7 @@ class GraphSolver:
                 max_iterations=12 if is_large else 60,
                 stall_limit=6 if is_large else 15,
             )
+        report(0.9)
 
         if (
             self.get_num_layers(best) > lower_bound
@@ -147,13 +212,31 @@ class GraphSolver:
 
         lower_bound = max(2, self._greedy_clique_size(graph))
 
-        # Exact max clique via branch and bound; sparse geometric conflict
-        # graphs solve in milliseconds-to-seconds, and a tight bound lets the
-        # portfolio certify optimality early, so gate only on extreme sizes.
+        # No clique is larger than the degeneracy + 1, so when the greedy
+        # clique already reaches that, it is maximum and the search is skipped.
+        try:
+            upper_bound = max(nx.core_number(graph).values()) + 1
+        except Exception:
+            upper_bound = graph.number_of_nodes()
+        if lower_bound >= upper_bound:
+            return lower_bound
+
+        # Exact max clique; sparse geometric conflict graphs solve in
+        # milliseconds-to-seconds, and a tight bound lets the portfolio
+        # certify optimality early, so gate only on extreme sizes.
         if graph.number_of_nodes() <= 12_000 and graph.number_of_edges() <= 200_000:
             try:
-                clique_nodes, _ = nx.max_weight_clique(graph, weight=None)
-                lower_bound = max(lower_bound, len(clique_nodes))
+                if nx.density(graph) <= self.SPARSE_CLIQUE_DENSITY:
+                    # Few maximal cliques: Bron-Kerbosch with pivoting lists
+                    # them far faster than max_weight_clique's branch and bound.
+                    for clique in nx.find_cliques(graph):
+                        if len(clique) > lower_bound:
+                            lower_bound = len(clique)
+                            if lower_bound >= upper_bound:
+                                break
+                else:
+                    clique_nodes, _ = nx.max_weight_clique(graph, weight=None)
+                    lower_bound = max(lower_bound, len(clique_nodes))
             except Exception:
                 pass
 
@@ -187,10 +270,12 @@ class GraphSolver:
         )
 
         best: Optional[Dict[int, int]] = None
+        best_count = 0
         for coloring in self._portfolio_candidates(graph, is_large):
-            if best is None or self.get_num_layers(coloring) < self.get_num_layers(best):
-                best = coloring
-            if self.get_num_layers(best) <= lower_bound:
+            count = self.get_num_layers(coloring)
+            if best is None or count < best_count:
+                best, best_count = coloring, count
+            if best_count <= lower_bound:
                 break
         return best
 
@@ -243,7 +328,8 @@ class GraphSolver:
         """
         rng = random.Random(1)
         best = dict(coloring)
-        current = dict(coloring)
+        best_count = self.get_num_layers(best)
+        current = best
         stalled = 0
 
         for iteration in range(max_iterations):
@@ -265,10 +351,13 @@ class GraphSolver:
             order = [node for color_class in class_list for node in color_class]
             current = self._greedy_from_order(graph, order)
 
-            if self.get_num_layers(current) < self.get_num_layers(best):
-                best = dict(current)
+            # Greedy colors are contiguous from 0, so max + 1 is the color count.
+            current_count = max(current.values()) + 1
+            if current_count < best_count:
+                # current is rebuilt every pass, never mutated, so no copy is needed.
+                best, best_count = current, current_count
                 stalled = 0
-                if self.get_num_layers(best) <= lower_bound:
+                if best_count <= lower_bound:
                     break
             else:
                 stalled += 1
@@ -343,16 +432,14 @@ class GraphSolver:
 
     def _normalize_colors(self, coloring: Dict[int, int]) -> Dict[int, int]:
         """Renumber colors to a contiguous 0..k-1 range, largest class first."""
-        class_sizes: Dict[int, int] = defaultdict(int)
-        for color in coloring.values():
-            class_sizes[color] += 1
-        remap = {
-            old_color: new_color
-            for new_color, old_color in enumerate(
-                sorted(class_sizes, key=lambda c: (-class_sizes[c], c))
-            )
-        }
-        return {node: remap[color] for node, color in coloring.items()}
+        if not coloring:
+            return {}
+        colors = np.fromiter(coloring.values(), dtype=np.int64, count=len(coloring))
+        palette, class_of, class_sizes = np.unique(colors, return_inverse=True, return_counts=True)
+        # Rank classes by size descending, ties broken by the old color.
+        remap = np.empty(len(palette), dtype=np.int64)
+        remap[np.lexsort((palette, -class_sizes))] = np.arange(len(palette))
+        return dict(zip(coloring.keys(), remap[class_of.ravel()].tolist()))
 
     def force_k_coloring(self, graph: nx.Graph, k: int) -> Dict[int, int]:
         """
@@ -366,27 +453,44 @@ class GraphSolver:
         Returns:
             A dictionary mapping node IDs to their assigned layer.
         """
-        coloring = {}
-        layers = [[] for _ in range(k)]
+        nodes = list(graph.nodes())
+        indptr, indices, weights = self._to_csr(graph)
 
         # Sort nodes by size (area) in descending order as a heuristic
-        sorted_nodes = sorted(graph.nodes(data=True), key=lambda x: x[1].get('size', 0), reverse=True)
-
-        for node, _ in sorted_nodes:
-            costs = np.zeros(k)
-            for i in range(k):
-                cost = 0
-                for neighbor in graph.neighbors(node):
-                    if neighbor in layers[i]:
-                        cost += graph[node][neighbor]['weight']
-                costs[i] = cost
-
-            # Assign node to the layer with the minimum cost
-            best_layer = np.argmin(costs)
-            layers[best_layer].append(node)
-            coloring[node] = best_layer
+        sizes = np.fromiter(
+            (size for _, size in graph.nodes(data="size", default=0)), dtype=np.float64, count=len(nodes)
+        )
+        # Stable, so equal sizes keep graph order.
+        order = np.argsort(-sizes, kind="stable").astype(np.int64)
 
-        return coloring
+        layer_of = _force_k_assign(indptr, indices, weights, order, int(k))
+        return dict(zip(nodes, layer_of.tolist()))
+
+    def _to_csr(self, graph: nx.Graph) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Compressed sparse row adjacency of the graph: the neighbors of the
+        i-th node of graph.nodes() are indices[indptr[i]:indptr[i + 1]], with
+        matching edge weights (1.0 when unweighted). Positions, not node ids.
+        """
+        nodes = list(graph.nodes())
+        position = {node: i for i, node in enumerate(nodes)}
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(
+            np.fromiter((len(graph[node]) for node in nodes), dtype=np.int64, count=len(nodes)),
+            out=indptr[1:],
+        )
+        num_entries = int(indptr[-1])
+        indices = np.fromiter(
+            (position[nbr] for node in nodes for nbr in graph[node]),
+            dtype=np.int64,
+            count=num_entries,
+        )
+        weights = np.fromiter(
+            (data.get("weight", 1.0) for node in nodes for data in graph[node].values()),
+            dtype=np.float64,
+            count=num_entries,
+        )
+        return indptr, indices, weights
 
     def optimize_coloring(
         self, graph: nx.Graph, initial_coloring: Dict[int, int], max_iterations: int = 100
@@ -403,13 +507,6 @@ class GraphSolver:
         )
         return self._normalize_colors(refined)
 
-    def _is_color_valid(self, graph: nx.Graph, node: int, color: int, coloring: Dict[int, int]) -> bool:
-        """Checks if a given color is valid for a node."""
-        for neighbor in graph.neighbors(node):
-            if neighbor in coloring and coloring[neighbor] == color:
-                return False
-        return True
-
     def get_num_layers(self, coloring: Dict[int, int]) -> int:
         """Calculates the number of layers from a coloring dictionary."""
         if not coloring:
@@ -1,13 +1,23 @@
+import hashlib
 import io
+import multiprocessing
 import os
+import re
+import sys
 import threading
-import traceback
 import tkinter as tk
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tkinter import filedialog, messagebox, ttk
 
-from cairosvg import svg2png
 from PIL import Image, ImageTk
 
+try:
+    import resvg_py
+except ImportError:  # resvg is an optional, much faster preview renderer (the "speed" extra)
+    resvg_py = None
+
 from . import gui_theme
 from . import gui_tabs
 from .main import (
@@ -20,7 +30,217 @@ from .main import (
 )
 
 
+# Rasterized previews persist here between sessions.
+CACHE_ROOT = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "diastasis",
+)
+PREVIEW_CACHE_DIR = os.path.join(CACHE_ROOT, "previews")
+PREVIEW_CACHE_MAX_FILES = 256
+# Oversampled previews can reach DiastasisGUI.PREVIEW_MAX_RENDER_SIDE per side, so the
+# file cap alone could let the cache grow to hundreds of MB.
+PREVIEW_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def rasterize_svg(svg_bytes, width, height, base_path=None, cache_dir=None):
+    """
+    Render SVG bytes to a PIL image that fits inside width x height.
+    Uses resvg when installed and CairoSVG otherwise; base_path resolves
+    relative references such as linked images. With cache_dir, the PNG is
+    kept there keyed on the SVG content and size, and later calls (also
+    from later sessions) load it instead of rendering again.
+    """
+    cache_path = png_data = None
+    if cache_dir is not None:
+        # The renderer is part of the key: resvg and CairoSVG output differ slightly.
+        digest = hashlib.sha1(svg_bytes)
+        digest.update(f"|{width}x{height}|{resvg_py is not None}|{base_path}".encode("utf-8"))
+        cache_path = os.path.join(cache_dir, digest.hexdigest() + ".png")
+        png_data = _read_cache_entry(cache_path)
+
+    if png_data is None:
+        png_data = _render_resvg_png(svg_bytes, width, height, base_path)
+        if png_data is None:
+            image = _render_cairo_image(svg_bytes, width, height, base_path)
+            if cache_path is not None:
+                # Only the disk cache needs PNG; the preview itself skips the encode/decode.
+                # Fastest zlib level: the entry is local and short-lived, and this
+                # encode delays the first paint.
+                buffer = io.BytesIO()
+                image.save(buffer, "PNG", compress_level=1)
+                _store_cache_entry(
+                    cache_dir, cache_path, buffer.getvalue(), PREVIEW_CACHE_MAX_FILES, PREVIEW_CACHE_MAX_BYTES
+                )
+            return image
+        if cache_path is not None:
+            _store_cache_entry(
+                cache_dir, cache_path, png_data, PREVIEW_CACHE_MAX_FILES, PREVIEW_CACHE_MAX_BYTES
+            )
+    image = Image.open(io.BytesIO(png_data))
+    # Decode now, on the calling (worker) thread, not lazily at first resize.
+    image.load()
+    return image
+
+
+def _render_resvg_png(svg_bytes, width, height, base_path):
+    """
+    PNG bytes from resvg, or None when it is not installed or cannot handle
+    this file (e.g. a non-UTF-8 encoding), so the caller falls back to CairoSVG.
+    """
+    if resvg_py is None:
+        return None
+    try:
+        return bytes(
+            resvg_py.svg_to_bytes(
+                svg_string=svg_bytes.decode("utf-8"),
+                width=width,
+                height=height,
+                resources_dir=os.path.dirname(os.path.abspath(base_path)) if base_path else None,
+            )
+        )
+    except Exception:
+        return None
+
+
+def _render_cairo_image(svg_bytes, width, height, base_path):
+    """
+    Render with CairoSVG straight from its pixel surface, with no PNG
+    encode and decode in between.
+    """
+    # Imported on first use: loading libcairo is slow and unneeded when resvg renders.
+    from cairosvg.parser import Tree
+    from cairosvg.surface import PNGSurface
+
+    # output=None draws in memory only; finish() would release the pixels.
+    surface = PNGSurface(
+        Tree(bytestring=svg_bytes, url=base_path), None, 96, output_width=width, output_height=height
+    ).cairo
+    surface.flush()
+    # ARGB32 is premultiplied, native-endian 32-bit words.
+    raw_mode = "BGRa" if sys.byteorder == "little" else "aRGB"
+    return Image.frombuffer(
+        "RGBa", (surface.get_width(), surface.get_height()), surface.get_data(),
+        "raw", raw_mode, surface.get_stride(), 1,
+    ).convert("RGBA")
+
+
+_SVG_ROOT_TAG = re.compile(rb"<svg\b[^>]*>", re.S)
+_SVG_LENGTH_ATTR = re.compile(
+    rb"""(?<![\w-])(width|height)\s*=\s*["']\s*((?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([a-zA-Z%]*)\s*["']"""
+)
+_SVG_VIEWBOX_ATTR = re.compile(rb"""(?<![\w-])viewBox\s*=\s*["']([^"']*)["']""")
+
+
+def svg_aspect_ratio(svg_bytes, head_size=4096):
+    """
+    Width / height of an SVG from its root tag's width and height (or
+    viewBox), read from the first head_size bytes without parsing or
+    rendering the document. None when the header does not say.
+    """
+    root = _SVG_ROOT_TAG.search(svg_bytes, 0, head_size)
+    if root is None:
+        return None
+    lengths = {name: (float(value), unit) for name, value, unit in _SVG_LENGTH_ATTR.findall(root.group())}
+    if b"width" in lengths and b"height" in lengths:
+        (width, width_unit), (height, height_unit) = lengths[b"width"], lengths[b"height"]
+        if width_unit == height_unit != b"%" and width > 0 and height > 0:
+            return width / height
+    view_box = _SVG_VIEWBOX_ATTR.search(root.group())
+    if view_box is not None:
+        try:
+            _, _, width, height = (float(part) for part in view_box.group(1).replace(b",", b" ").split())
+            if width > 0 and height > 0:
+                return width / height
+        except ValueError:
+            pass
+    return None
+
+
+def _read_cache_entry(cache_path):
+    """Bytes of a cache entry, or None when there is none."""
+    try:
+        with open(cache_path, "rb") as cached:
+            data = cached.read()
+        os.utime(cache_path)  # Pruning drops the least recently used entries.
+        return data
+    except OSError:
+        return None
+
+
+def _store_cache_entry(cache_dir, cache_path, data, max_files, max_bytes):
+    """
+    Write data to cache_path, then drop the oldest entries of its kind until
+    at most max_files remain, totalling at most max_bytes. The newest entry
+    is always kept.
+    """
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write then rename so a concurrent reader never sees a partial entry.
+        temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as cached:
+            cached.write(data)
+        os.replace(temp_path, cache_path)
+        suffix = os.path.splitext(cache_path)[1]
+        with os.scandir(cache_dir) as entries:
+            stored = [(entry.stat(), entry.path) for entry in entries if entry.name.endswith(suffix)]
+        stored.sort(key=lambda item: item[0].st_mtime, reverse=True)
+        kept, total_bytes = 0, 0
+        for stat, path in stored:
+            if kept and (kept >= max_files or total_bytes + stat.st_size > max_bytes):
+                os.remove(path)
+                continue
+            kept += 1
+            total_bytes += stat.st_size
+    except OSError:
+        pass  # The cache is an optimization; a read-only or full disk just skips it.
+
+
+def _result_cache_key(svg_bytes, mode, run_options):
+    """Identifies run_diastasis output for this SVG content, mode and options."""
+    return (hashlib.blake2b(svg_bytes, digest_size=16).digest(), mode, tuple(sorted(run_options.items())))
+
+
+def _process_batch_file(filepath, output_dir, mode, run_options, save_options):
+    """
+    Process and save one batch file; runs in a worker process, so it takes
+    only plain values. Returns None on success or an error message.
+    """
+    try:
+        result = run_diastasis(filepath, mode=mode, **run_options)
+        if not result or len(result) < 5:
+            return "Processing failed"
+        shapes, coloring, _summary, svg_width, svg_height = result
+        base_filename = os.path.splitext(os.path.basename(filepath))[0] + f"_{mode}"
+        save_layers_to_files(
+            shapes, coloring, output_dir, base_filename, svg_width, svg_height, **save_options
+        )
+    except Exception as exc:
+        return str(exc)
+    return None
+
+
 class DiastasisGUI:
+    # A cached preview is rescaled rather than re-rendered while the fit scale
+    # stays in this range: never upscaled (blurry), and at most quartered.
+    PREVIEW_RESCALE_RANGE = (0.25, 1.0)
+    # Previews are rendered at this multiple of the canvas size (capped per
+    # side, but never below the canvas) so growing the window up to that
+    # factor only rescales the cached raster. 1.5 keeps the settled LANCZOS
+    # downscale sharp at ~56% of the pixels a 2x render costs.
+    PREVIEW_OVERSAMPLE = 1.5
+    PREVIEW_MAX_RENDER_SIDE = 1600
+    # <Configure> fires many times per drag; redraw once it settles this long (ms).
+    PREVIEW_RESIZE_DEBOUNCE_MS = 80
+    # Complexity estimates kept for re-selected files (least recently used evicted).
+    ESTIMATE_CACHE_SIZE = 64
+    # Decoded original-file previews kept in memory for re-selected files; at
+    # most PREVIEW_MAX_RENDER_SIDE squared RGBA each (~10 MB).
+    PREVIEW_RASTER_CACHE_SIZE = 4
+    # Processing results kept for the session, so pressing Process again
+    # with unchanged content and settings skips the pipeline. Only in
+    # memory: results never outlive the code that produced them.
+    RESULT_CACHE_SIZE = 8
+
     def __init__(self, root):
         self.root = root
         self.root.title("Mozaix Diastasis")
@@ -32,7 +252,32 @@ class DiastasisGUI:
         self._theme_mode = "light"
 
         self.filepath = ""
+        # Base name of filepath without extension, for default output names.
+        self._file_stem = ""
         self.preview_image = None
+        # Bytes of the selected SVG, read once so previews don't reopen the file.
+        self._svg_bytes = b""
+        self._svg_mtime_ns = None
+        # Its width / height from the root tag (see svg_aspect_ratio), if stated.
+        self._svg_aspect = None
+        # Last rasterized preview and the source it shows; resizes within
+        # PREVIEW_RESCALE_RANGE reuse it instead of re-rendering the SVG.
+        self._preview_source_image = None
+        self._preview_source_key = None
+        self._preview_source_data = None
+        # (path, mtime_ns) -> last raster of that file, for re-selected files.
+        self._preview_raster_cache = OrderedDict()
+        # (key, data, bytes) of the last separated-preview SVG document, so a
+        # re-render at another size skips rebuilding its markup. Holding data
+        # keeps the id() in the key from being reused.
+        self._separated_svg = None
+        # Pending after() id for a debounced resize redraw.
+        self._resize_after_id = None
+        self._last_preview_size = None
+        # (source key, raster size, shown size) of the last final-quality draw.
+        self._last_drawn = None
+        # Bumped per preview request so late background renders are discarded.
+        self._preview_request_id = 0
 
         self.algorithm = tk.StringVar(value="minimum_layers")
         self.use_optimizer = tk.BooleanVar(value=False)
@@ -53,6 +298,15 @@ class DiastasisGUI:
         self.flat_touch_policy = tk.StringVar(value="No edge/corner touching")
         self.flat_priority_order = tk.StringVar(value="Source order")
         self.complexity_estimate = None
+        # (path, mtime_ns, size) -> estimate; an edited file gets a new key.
+        self._estimate_cache = OrderedDict()
+        # _result_cache_key -> run_diastasis five-tuple; shared between the Tk thread and processing threads.
+        self._result_cache = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+        # Latest progress value awaiting the next idle flush, if any.
+        self._pending_progress = None
+        # Mirror of the results box text, so updates can replace only what changed.
+        self._results_shown = ""
 
         self.results_by_mode = {
             "overlaid": None,
@@ -128,6 +382,7 @@ class DiastasisGUI:
             width=16,
         )
         self.export_profile_combo.pack(side=tk.LEFT)
+        self.export_profile_combo.bind("<<ComboboxSelected>>", lambda _evt: self.on_export_option_change())
 
         estimate_frame = ttk.Frame(left_frame)
         estimate_frame.pack(fill=tk.X, pady=(0, 8))
@@ -156,6 +411,7 @@ class DiastasisGUI:
             clip_frame,
             text="Preserve Original Colors On Export",
             variable=self.preserve_colors,
+            command=self.on_export_option_change,
         )
         self.preserve_colors_check.pack(anchor=tk.W)
         self.include_strokes_check = ttk.Checkbutton(
@@ -191,9 +447,10 @@ class DiastasisGUI:
         self.mode_notebook.add(self.color_tab, text="Color Separation")
         self.mode_notebook.bind("<<NotebookTabChanged>>", self.on_mode_change)
 
+        # Only the initially selected tab is built now; the others are built
+        # the first time they are selected (see _ensure_tab_built).
         gui_tabs.build_overlaid_tab(self)
-        gui_tabs.build_flat_tab(self)
-        gui_tabs.build_color_tab(self)
+        self._built_tabs = {"overlaid"}
 
         process_frame = ttk.Frame(left_frame)
         process_frame.pack(fill=tk.X, pady=(10, 0))
@@ -207,7 +464,7 @@ class DiastasisGUI:
         results_frame = ttk.LabelFrame(left_frame, text="Results")
         results_frame.pack(fill=tk.BOTH, expand=True)
 
-        self.results_text = tk.Text(results_frame, height=11, wrap=tk.WORD)
+        self.results_text = tk.Text(results_frame, height=11, wrap=tk.WORD, state="disabled")
         self.results_text.pack(fill=tk.BOTH, expand=True, padx=6, pady=6)
 
         save_frame = ttk.Frame(left_frame)
@@ -246,22 +503,30 @@ class DiastasisGUI:
         self.preview_canvas = tk.Canvas(right_frame, bg="white")
         self.preview_canvas.pack(fill=tk.BOTH, expand=True)
         self.preview_canvas.bind("<Configure>", self.on_preview_resize)
+        # Canvas image item reused by every redraw; created on first use.
+        self._preview_item = None
 
         self.on_algo_change()
         self.apply_quality_preset()
         self._apply_non_macos_theme()
 
     def on_algo_change(self):
-        if self.algorithm.get() == "force_k":
-            self.num_layers_frame.pack(fill=tk.X, padx=4, pady=(0, 8))
-        else:
-            self.num_layers_frame.pack_forget()
+        self._show_packed(self.num_layers_frame, self.algorithm.get() == "force_k")
 
     def on_flat_algo_change(self):
-        if self.flat_algorithm.get() == "force_k":
-            self.flat_num_layers_frame.pack(fill=tk.X, padx=4, pady=(0, 8))
+        if "flat" not in self._built_tabs:
+            return  # build_flat_tab applies the current algorithm itself.
+        self._show_packed(self.flat_num_layers_frame, self.flat_algorithm.get() == "force_k")
+
+    @staticmethod
+    def _show_packed(frame, shown):
+        """Pack or unpack frame, touching geometry only when its visibility flips."""
+        if bool(frame.winfo_ismanaged()) == shown:
+            return
+        if shown:
+            frame.pack(fill=tk.X, padx=4, pady=(0, 8))
         else:
-            self.flat_num_layers_frame.pack_forget()
+            frame.pack_forget()
 
     MODE_BY_TAB = {
         "Flat Complexity": "flat",
@@ -273,22 +538,62 @@ class DiastasisGUI:
         "flat": "Flat Complexity",
         "color": "Color Separation",
     }
+    # UI labels of the flat-mode comboboxes -> run_diastasis values. The
+    # comboboxes list these keys, so labels are spelled out only here.
+    FLAT_TOUCH_POLICIES = {
+        "No edge/corner touching": "any_touch",
+        "Allow corner touching": "edge_or_overlap",
+    }
+    FLAT_PRIORITY_ORDERS = {
+        "Source order": "source",
+        "Largest first": "largest_first",
+        "Smallest first": "smallest_first",
+    }
 
     def get_active_mode(self):
         tab_id = self.mode_notebook.select()
         tab_text = self.mode_notebook.tab(tab_id, "text")
         return self.MODE_BY_TAB.get(tab_text, "overlaid")
 
+    def _set_results_text(self, text, append=False):
+        """
+        Replace (or append to) the read-only results box with one insert, so
+        Tk lays the widget out once per update. A replacement keeps the text
+        it shares with what is shown and rewrites only the changed tail.
+        """
+        if append:
+            start, new_text = len(self._results_shown), self._results_shown + text
+        else:
+            if text == self._results_shown:
+                return
+            start, new_text = len(os.path.commonprefix([self._results_shown, text])), text
+        self.results_text.configure(state="normal")
+        self.results_text.delete(f"1.0 + {start} chars", tk.END)
+        self.results_text.insert(tk.END, new_text[start:])
+        self.results_text.configure(state="disabled")
+        self._results_shown = new_text
+
+    TAB_BUILDERS = {
+        "overlaid": gui_tabs.build_overlaid_tab,
+        "flat": gui_tabs.build_flat_tab,
+        "color": gui_tabs.build_color_tab,
+    }
+
+    def _ensure_tab_built(self, mode):
+        if mode not in self._built_tabs:
+            self.TAB_BUILDERS[mode](self)
+            self._built_tabs.add(mode)
+
     def on_mode_change(self, _event=None):
         mode = self.get_active_mode()
+        self._ensure_tab_built(mode)
         mode_result = self.results_by_mode.get(mode)
 
-        self.results_text.delete(1.0, tk.END)
         if mode_result is None:
-            self.results_text.insert(tk.END, f"Mode: {self.MODE_LABELS[mode]}\n")
+            self._set_results_text(f"Mode: {self.MODE_LABELS[mode]}\n")
             self._set_save_buttons_state("disabled")
         else:
-            self.results_text.insert(tk.END, mode_result["summary"])
+            self._set_results_text(mode_result["summary"])
             self._set_save_buttons_state("normal")
         if self.filepath and self.preview_mode.get() == "Separated":
             self.display_preview()
@@ -321,6 +626,14 @@ class DiastasisGUI:
         )
         if filepath:
             self.filepath = filepath
+            self._file_stem = os.path.splitext(os.path.basename(filepath))[0]
+            self._svg_bytes, self._svg_mtime_ns, self._svg_aspect = b"", None, None
+            self._refresh_svg_bytes()
+            # Drop the previous file's raster now: it is never reused (the key
+            # differs), and until the new render lands a resize would
+            # otherwise draw the old artwork as its draft frame.
+            self._preview_source_image = self._preview_source_key = None
+            self._preview_source_data = self._separated_svg = None
             self.filepath_label.config(text=os.path.basename(filepath))
             self.preview_mode.set("Original")
             self.display_preview()
@@ -329,17 +642,42 @@ class DiastasisGUI:
             self.on_mode_change()
             self.estimate_complexity()
 
+    def _refresh_svg_bytes(self):
+        """(Re)read the selected SVG when its mtime differs from the bytes in memory."""
+        try:
+            mtime_ns = os.stat(self.filepath).st_mtime_ns
+        except OSError:
+            return  # Keep what was read; the file may be mid-save.
+        if mtime_ns != self._svg_mtime_ns:
+            with open(self.filepath, "rb") as svg_file:
+                self._svg_bytes = svg_file.read()
+            self._svg_mtime_ns = mtime_ns
+            self._svg_aspect = svg_aspect_ratio(self._svg_bytes)
+
     def estimate_complexity(self):
         if not self.filepath:
             return
+        try:
+            stat = os.stat(self.filepath)
+        except OSError:
+            key = None
+        else:
+            key = (self.filepath, stat.st_mtime_ns, stat.st_size)
+        if key in self._estimate_cache:
+            self._estimate_cache.move_to_end(key)
+            self._set_complexity_estimate(self._estimate_cache[key])
+            return
         self.estimate_label.config(text="Complexity Report:\nEstimating...")
-        thread = threading.Thread(target=self._estimate_complexity_thread, daemon=True)
+        thread = threading.Thread(
+            target=self._estimate_complexity_thread, args=(self._svg_bytes, key), daemon=True
+        )
         thread.start()
 
-    def _estimate_complexity_thread(self):
+    def _estimate_complexity_thread(self, svg_bytes, key):
         try:
-            estimate = estimate_processing_complexity(self.filepath)
-            self.root.after(0, lambda: self._set_complexity_estimate(estimate))
+            # Parse the bytes select_file already read instead of reopening the file.
+            estimate = estimate_processing_complexity(io.BytesIO(svg_bytes))
+            self.root.after(0, lambda: self._cache_complexity_estimate(key, estimate))
         except Exception as exc:
             # Bind the message now: `exc` is deleted when the except block
             # exits, before the deferred lambda runs.
@@ -348,6 +686,15 @@ class DiastasisGUI:
                 0, lambda: self.estimate_label.config(text=f"Complexity: estimate failed ({message})")
             )
 
+    def _cache_complexity_estimate(self, key, estimate):
+        if key is not None:
+            self._estimate_cache[key] = estimate
+            if len(self._estimate_cache) > self.ESTIMATE_CACHE_SIZE:
+                self._estimate_cache.popitem(last=False)
+        # A result for a file the user has since moved away from is cached only.
+        if key is None or key[0] == self.filepath:
+            self._set_complexity_estimate(estimate)
+
     def _set_complexity_estimate(self, estimate):
         self.complexity_estimate = estimate
         eta = estimate["eta_seconds"]
@@ -362,61 +709,255 @@ class DiastasisGUI:
         )
 
     def display_preview(self):
+        # A direct redraw supersedes any pending debounced one.
+        if self._resize_after_id is not None:
+            self.root.after_cancel(self._resize_after_id)
+            self._resize_after_id = None
         if not self.filepath:
             return
 
         try:
+            self._refresh_svg_bytes()
             canvas_width = self.preview_canvas.winfo_width()
             canvas_height = self.preview_canvas.winfo_height()
 
             if canvas_width <= 1 or canvas_height <= 1:
-                self.root.after(100, self.display_preview)
+                # Not mapped yet. Reuse the debounce handle so repeated calls
+                # before the first <Configure> leave a single pending retry.
+                self._resize_after_id = self.root.after(100, self.display_preview)
                 return
 
-            png_data = svg2png(output_width=1200, output_height=1200, **self._preview_svg_source())
-            image = Image.open(io.BytesIO(png_data))
-
-            img_width, img_height = image.size
-            scale = min(canvas_width / img_width, canvas_height / img_height)
-            new_width = max(1, int(img_width * scale))
-            new_height = max(1, int(img_height * scale))
+            # Any raster still being produced for an older request is now stale.
+            self._preview_request_id += 1
+            data = self._separated_preview_data()
+            # The mtime makes an on-disk edit of the SVG a new cache key.
+            key = (self.filepath, self._svg_mtime_ns)
+            if data is not None:
+                # The cache holds data itself, so its id cannot be reused meanwhile.
+                key += (id(data), self.preserve_colors.get(), self.export_profile.get())
+
+            source = self._preview_source_image
+            if source is not None and self._preview_item is not None:
+                drawn = (key, source.size, self._fit_size(source, canvas_width, canvas_height))
+                if drawn == self._last_drawn:
+                    # That exact image is already on screen: just recenter it.
+                    self.preview_canvas.coords(self._preview_item, canvas_width // 2, canvas_height // 2)
+                    return
+
+            cached = self._reusable_cached_preview(key, canvas_width, canvas_height)
+            if cached is not None:
+                # Even a rescale is tens of ms at LANCZOS quality; a resize has
+                # already shown a NEAREST draft, so the main thread need not wait.
+                thread = threading.Thread(
+                    target=self._fit_preview_thread,
+                    args=(self._preview_request_id, key, data, cached, canvas_width, canvas_height),
+                    daemon=True,
+                )
+                thread.start()
+                return
 
-            resized_image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            self.preview_image = ImageTk.PhotoImage(resized_image)
+            render_width, render_height = (
+                max(side, min(int(side * self.PREVIEW_OVERSAMPLE), self.PREVIEW_MAX_RENDER_SIDE))
+                for side in (canvas_width, canvas_height)
+            )
+            aspect = self._svg_aspect
+            if data is not None and data["svg_width"] > 0 and data["svg_height"] > 0:
+                aspect = data["svg_width"] / data["svg_height"]
+            if aspect is not None:
+                # Ask for the letterboxed size itself, so canvases that differ
+                # only in the letterbox margin share one disk-cache entry.
+                if render_width > render_height * aspect:
+                    render_width = max(1, round(render_height * aspect))
+                else:
+                    render_height = max(1, round(render_width / aspect))
+            svg_bytes = self._svg_bytes
+            if data is not None:
+                built = self._separated_svg
+                svg_bytes = built[2] if built is not None and built[0] == key else None
+            # Tk variables are read here; the worker only sees plain values.
+            thread = threading.Thread(
+                target=self._rasterize_preview_thread,
+                args=(
+                    self._preview_request_id, key, data, self.filepath, svg_bytes,
+                    self.preserve_colors.get(), self.export_profile.get(), render_width, render_height,
+                    canvas_width, canvas_height,
+                ),
+                daemon=True,
+            )
+            thread.start()
+        except Exception as exc:
+            self._show_preview_unavailable(exc)
+
+    def _reusable_cached_preview(self, key, canvas_width, canvas_height):
+        """
+        The cached raster when it can be rescaled to the canvas, or None when
+        the source changed or the fit scale left PREVIEW_RESCALE_RANGE and
+        the SVG has to be rasterized again. A re-selected file is found in
+        _preview_raster_cache.
+        """
+        image = self._preview_source_image
+        if image is None or key != self._preview_source_key:
+            image = self._preview_raster_cache.get(key)
+            if image is None:
+                return None
+        scale = min(canvas_width / image.width, canvas_height / image.height)
+        low, high = self.PREVIEW_RESCALE_RANGE
+        if not low <= scale <= high:
+            return None
+        return image
+
+    def _fit_preview_thread(self, request_id, key, data, image, canvas_width, canvas_height):
+        """LANCZOS-fit a cached raster off the Tk main thread."""
+        fitted = self._fit_image(image, canvas_width, canvas_height, Image.Resampling.LANCZOS)
+        self.root.after(0, lambda: self._finish_preview(request_id, key, data, image, fitted))
 
-            self.preview_canvas.delete("all")
-            self.preview_canvas.create_image(canvas_width // 2, canvas_height // 2, image=self.preview_image, anchor=tk.CENTER)
+    @staticmethod
+    def _fit_size(image, width, height):
+        """Size of image scaled to fit inside width x height, keeping its aspect ratio."""
+        scale = min(width / image.width, height / image.height)
+        return max(1, int(image.width * scale)), max(1, int(image.height * scale))
+
+    @classmethod
+    def _fit_image(cls, image, width, height, resample):
+        """image scaled to fit inside width x height, keeping its aspect ratio."""
+        size = cls._fit_size(image, width, height)
+        return image if size == image.size else image.resize(size, resample)
+
+    def _rasterize_preview_thread(
+        self, request_id, key, data, filepath, svg_bytes, preserve_colors, export_profile,
+        render_width, render_height, canvas_width, canvas_height,
+    ):
+        """
+        Build (when svg_bytes is None), rasterize and fit the preview off
+        the Tk main thread.
+        """
+        try:
+            if svg_bytes is None:
+                svg_bytes = build_layered_svg_string(
+                    data["shapes"],
+                    data["coloring"],
+                    data["svg_width"],
+                    data["svg_height"],
+                    preserve_original_colors=preserve_colors,
+                    export_profile=export_profile,
+                ).encode("utf-8")
+                # One attribute store, which the main thread only reads.
+                self._separated_svg = (key, data, svg_bytes)
+            # Separated previews are transient; only the opened file's raster is kept on disk.
+            cache_dir = PREVIEW_CACHE_DIR if data is None else None
+            image = rasterize_svg(svg_bytes, render_width, render_height, filepath, cache_dir)
+            # The LANCZOS fit is the costly part of the settled frame; do it here too.
+            fitted = self._fit_image(image, canvas_width, canvas_height, Image.Resampling.LANCZOS)
+            self.root.after(0, lambda: self._finish_preview(request_id, key, data, image, fitted))
         except Exception as exc:
-            print(f"Error displaying preview: {exc}")
+            self.root.after(
+                0, lambda error=exc: self._finish_preview(request_id, key, data, None, error=error)
+            )
+
+    def _finish_preview(self, request_id, key, data, image, fitted=None, error=None):
+        """Main-thread half of a background rasterization; stale results are dropped."""
+        if request_id != self._preview_request_id:
+            return
+        if error is not None:
+            self._show_preview_unavailable(error)
+            return
+        self._preview_source_image, self._preview_source_key = image, key
+        self._preview_source_data = data
+        if data is None:
+            self._preview_raster_cache[key] = image
+            self._preview_raster_cache.move_to_end(key)
+            if len(self._preview_raster_cache) > self.PREVIEW_RASTER_CACHE_SIZE:
+                self._preview_raster_cache.popitem(last=False)
+        canvas_width = self.preview_canvas.winfo_width()
+        canvas_height = self.preview_canvas.winfo_height()
+        if fitted is None or fitted.size != self._fit_size(image, canvas_width, canvas_height):
+            # The canvas changed size while the worker ran.
+            fitted = self._fit_image(image, canvas_width, canvas_height, Image.Resampling.LANCZOS)
+        self._show_preview_image(fitted, canvas_width, canvas_height)
+        self._last_drawn = (key, image.size, fitted.size)
+
+    def _show_preview_image(self, image, canvas_width, canvas_height):
+        # PhotoImage must be created on the Tk main thread.
+        photo = self.preview_image
+        if photo is not None and (photo.width(), photo.height()) == image.size:
+            # Same size: upload new pixels into the existing Tk image, which
+            # the canvas item already shows.
+            photo.paste(image)
+        else:
+            self.preview_image = ImageTk.PhotoImage(image)
+        center = (canvas_width // 2, canvas_height // 2)
+        if self._preview_item is None:
+            # Also clears a "Preview not available" note left by an earlier failure.
             self.preview_canvas.delete("all")
-            canvas_width = self.preview_canvas.winfo_width()
-            canvas_height = self.preview_canvas.winfo_height()
-            self.preview_canvas.create_text(
-                canvas_width // 2 if canvas_width > 1 else 200,
-                canvas_height // 2 if canvas_height > 1 else 200,
-                text="Preview not available",
-                anchor=tk.CENTER,
+            self._preview_item = self.preview_canvas.create_image(
+                *center, image=self.preview_image, anchor=tk.CENTER
             )
+        else:
+            self.preview_canvas.coords(self._preview_item, *center)
+            if self.preview_image is not photo:
+                self.preview_canvas.itemconfigure(self._preview_item, image=self.preview_image)
+
+    def _show_preview_unavailable(self, exc):
+        print(f"Error displaying preview: {exc}")
+        self.preview_canvas.delete("all")
+        self._preview_item = None
+        self._last_drawn = None
+        canvas_width = self.preview_canvas.winfo_width()
+        canvas_height = self.preview_canvas.winfo_height()
+        self.preview_canvas.create_text(
+            canvas_width // 2 if canvas_width > 1 else 200,
+            canvas_height // 2 if canvas_height > 1 else 200,
+            text="Preview not available",
+            anchor=tk.CENTER,
+        )
 
-    def _preview_svg_source(self):
-        """svg2png source kwargs: the separated result if requested and available."""
+    def _separated_preview_data(self):
+        """The active mode's result when the separated preview can show it."""
         if self.preview_mode.get() == "Separated":
             data = self.results_by_mode.get(self.get_active_mode())
             if data and data.get("source_filepath") == self.filepath:
-                layered = build_layered_svg_string(
-                    data["shapes"],
-                    data["coloring"],
-                    data["svg_width"],
-                    data["svg_height"],
-                    preserve_original_colors=self.preserve_colors.get(),
-                    export_profile=self.export_profile.get(),
-                )
-                return {"bytestring": layered.encode("utf-8")}
-        return {"url": self.filepath}
-
-    def on_preview_resize(self, _event):
-        if self.preview_image is not None:
-            self.display_preview()
+                return data
+        return None
+
+    def on_preview_resize(self, event):
+        # Tk also sends <Configure> for moves and restyling (e.g. a theme
+        # toggle); only a real size change needs the preview redrawn.
+        size = (event.width, event.height)
+        if size == self._last_preview_size:
+            return
+        self._last_preview_size = size
+        if self.preview_image is None:
+            return
+        # Follow the drag with a cheap NEAREST rescale of the cached raster;
+        # only the debounced, settled redraw below pays for LANCZOS.
+        image = self._preview_source_image
+        if image is not None and event.width > 1 and event.height > 1:
+            photo = self.preview_image
+            shown = (photo.width(), photo.height())
+            if self._preview_item is not None and shown == self._fit_size(image, event.width, event.height):
+                # The letterboxed size is unchanged (e.g. the limiting side did
+                # not move): recenter what is shown instead of rescaling a copy.
+                self.preview_canvas.coords(self._preview_item, event.width // 2, event.height // 2)
+            else:
+                fitted = self._fit_image(image, event.width, event.height, Image.Resampling.NEAREST)
+                self._show_preview_image(fitted, event.width, event.height)
+                # A draft frame: the debounced redraw must not skip replacing it.
+                self._last_drawn = None
+        self.schedule_preview()
+
+    def schedule_preview(self):
+        """
+        Redraw the preview once input settles: each call restarts a
+        PREVIEW_RESIZE_DEBOUNCE_MS wait, so a burst costs one redraw.
+        """
+        if self._resize_after_id is not None:
+            self.root.after_cancel(self._resize_after_id)
+        self._resize_after_id = self.root.after(self.PREVIEW_RESIZE_DEBOUNCE_MS, self.display_preview)
+
+    def on_export_option_change(self):
+        # The separated preview is built with these options; the original is not.
+        if self.filepath and self.preview_mode.get() == "Separated":
+            self.schedule_preview()
 
     def process_file(self):
         if not self.filepath:
@@ -424,24 +965,39 @@ class DiastasisGUI:
             return
 
         mode = self.get_active_mode()
+        # Snapshot the Tk variables here; the worker thread must not touch them.
+        # Validated before anything is disabled, so a bad entry cannot lock the UI.
+        run_options = self._validated_run_options()
+        if run_options is None:
+            return
 
         self.process_button.config(state="disabled")
         self.batch_button.config(state="disabled")
         self.select_button.config(state="disabled")
         self._set_save_buttons_state("disabled")
-        self.progress["value"] = 0
         self.progress["maximum"] = 100
-        self.results_text.delete(1.0, tk.END)
-        self.results_text.insert(tk.END, "Processing...\n")
+        self._request_progress(0)
+        self._set_results_text("Processing...\n")
 
         filepath = self.filepath
-        thread = threading.Thread(target=lambda: self.run_process_thread(filepath, mode), daemon=True)
+        self._refresh_svg_bytes()
+        svg_bytes = self._svg_bytes
+        thread = threading.Thread(
+            target=lambda: self.run_process_thread(filepath, mode, run_options, svg_bytes), daemon=True
+        )
         thread.start()
-        self.animate_progress()
 
-    def run_process_thread(self, filepath, mode):
+    def run_process_thread(self, filepath, mode, run_options, svg_bytes):
         try:
-            result = self._run_with_current_options(filepath, mode)
+            result = self._cached_result(svg_bytes, mode, run_options)
+            if result is None:
+                # Process the bytes already in memory, the same ones the cache key hashed,
+                # rather than re-reading a file that may have changed since.
+                result = run_diastasis(
+                    io.BytesIO(svg_bytes), mode=mode, progress_callback=self._post_progress, **run_options
+                )
+                if result and len(result) >= 5:
+                    self._store_result(svg_bytes, mode, run_options, tuple(result[:5]))
 
             if result and len(result) >= 5:
                 shapes, coloring, summary, svg_width, svg_height = result
@@ -463,23 +1019,51 @@ class DiastasisGUI:
             error_msg = f"Error during processing: {exc}"
             self.root.after(0, lambda: self.processing_error(error_msg))
 
-    def animate_progress(self):
-        if self.process_button["state"] == "disabled":
-            current = self.progress["value"]
-            if current < 90:
-                self.progress["value"] = current + 2
-            self.root.after(100, self.animate_progress)
+    def _cached_result(self, svg_bytes, mode, run_options):
+        """
+        The run_diastasis result stored for this exact SVG content and these
+        options by an earlier Process this session, or None. Runs on the
+        worker thread.
+        """
+        key = _result_cache_key(svg_bytes, mode, run_options)
+        with self._result_cache_lock:
+            result = self._result_cache.get(key)
+            if result is None:
+                return None
+            self._result_cache.move_to_end(key)
+        self._post_progress("done", 1.0)
+        return result
+
+    def _store_result(self, svg_bytes, mode, run_options, result):
+        key = _result_cache_key(svg_bytes, mode, run_options)
+        with self._result_cache_lock:
+            self._result_cache[key] = result
+            if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+
+    def _post_progress(self, _stage, fraction):
+        """run_diastasis progress callback; runs on the worker thread."""
+        self.root.after(0, lambda: self._request_progress(int(fraction * 100)))
+
+    def _request_progress(self, value):
+        """Set the progress bar, coalescing bursts into one redraw per idle cycle."""
+        if self._pending_progress is None:
+            self.root.after_idle(self._flush_progress)
+        self._pending_progress = value
+
+    def _flush_progress(self):
+        self.progress["value"] = self._pending_progress
+        self._pending_progress = None
 
     def processing_complete(self, mode, summary):
-        self.progress["value"] = 100
+        self._request_progress(100)
         self.process_button.config(state="normal")
         self.batch_button.config(state="normal")
         self.select_button.config(state="normal")
 
         current_mode = self.get_active_mode()
         if current_mode == mode:
-            self.results_text.delete(1.0, tk.END)
-            self.results_text.insert(tk.END, summary)
+            self._set_results_text(summary)
             self._set_save_buttons_state("normal")
             # Show the artist what the separation looks like right away.
             self.preview_mode.set("Separated")
@@ -488,18 +1072,24 @@ class DiastasisGUI:
             self._set_save_buttons_state("disabled")
 
     def processing_error(self, error_msg):
-        self.progress["value"] = 0
+        self._request_progress(0)
         self.process_button.config(state="normal")
         self.batch_button.config(state="normal")
         self.select_button.config(state="normal")
 
-        self.results_text.delete(1.0, tk.END)
-        self.results_text.insert(tk.END, f"Error: {error_msg}")
+        self._set_results_text(f"Error: {error_msg}")
         self._set_save_buttons_state("disabled")
 
         messagebox.showerror("Processing Error", error_msg)
 
     def batch_process_folder(self):
+        # Tk variables are read here; the batch workers only see plain values.
+        # Validated before the dialogs, and before anything is disabled.
+        run_options = self._validated_run_options()
+        if run_options is None:
+            return
+        save_options = self._current_export_options()
+
         input_dir = filedialog.askdirectory(title="Select Folder with SVG files")
         if not input_dir:
             return
@@ -508,23 +1098,26 @@ class DiastasisGUI:
             return
 
         mode = self.get_active_mode()
-        self.results_text.delete(1.0, tk.END)
-        self.results_text.insert(tk.END, "Batch processing started...\n")
+        self._set_results_text("Batch processing started...\n")
         self.process_button.config(state="disabled")
         self.batch_button.config(state="disabled")
         self.select_button.config(state="disabled")
+        self.progress["maximum"] = 100
+        self._request_progress(0)
 
         thread = threading.Thread(
-            target=lambda: self._run_batch_thread(input_dir, output_dir, mode),
+            target=lambda: self._run_batch_thread(input_dir, output_dir, mode, run_options, save_options),
             daemon=True,
         )
         thread.start()
 
-    def _run_batch_thread(self, input_dir, output_dir, mode):
-        svg_files = sorted(
-            f for f in os.listdir(input_dir)
-            if f.lower().endswith(".svg") and os.path.isfile(os.path.join(input_dir, f))
-        )
+    def _run_batch_thread(self, input_dir, output_dir, mode, run_options, save_options):
+        # DirEntry.is_file() answers from the directory listing, without a stat per entry.
+        with os.scandir(input_dir) as entries:
+            svg_files = sorted(
+                entry.name for entry in entries
+                if entry.name.lower().endswith(".svg") and entry.is_file()
+            )
         if not svg_files:
             self.root.after(0, lambda: self.processing_error("No SVG files found in selected folder."))
             return
@@ -532,47 +1125,51 @@ class DiastasisGUI:
         failures = []
         successes = 0
 
-        for filename in svg_files:
-            filepath = os.path.join(input_dir, filename)
-            try:
-                result = self._process_single_file(filepath, mode)
-                if not result or len(result) < 5:
-                    failures.append((filename, "Processing failed"))
-                    continue
-                shapes, coloring, _summary, svg_width, svg_height = result
-                base_filename = os.path.splitext(filename)[0] + f"_{mode}"
-                save_layers_to_files(
-                    shapes,
-                    coloring,
-                    output_dir,
-                    base_filename,
-                    svg_width,
-                    svg_height,
-                    preserve_original_colors=self.preserve_colors.get(),
-                    export_profile=self.export_profile.get(),
-                )
-                successes += 1
-            except Exception as exc:
-                failures.append((filename, str(exc)))
+        # Processing is CPU-bound Python, so files run in separate processes.
+        # Spawned, not forked: forking this multithreaded Tk process could copy
+        # a lock another thread holds and deadlock the worker.
+        with ProcessPoolExecutor(
+            max_workers=min(len(svg_files), os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _process_batch_file, os.path.join(input_dir, filename), output_dir, mode,
+                    run_options, save_options,
+                ): filename
+                for filename in svg_files
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                filename = futures[future]
+                try:
+                    error = future.result()
+                except Exception as exc:  # e.g. a worker process died
+                    error = str(exc)
+                if error is None:
+                    successes += 1
+                else:
+                    failures.append((filename, error))
+                note = f"[{done}/{len(svg_files)}] {filename}: {'done' if error is None else 'failed'}\n"
+                value = int(done * 100 / len(svg_files))
+                self.root.after(0, lambda note=note, value=value: self._batch_file_done(note, value))
+        failures.sort()
 
         def finish_batch():
             self.process_button.config(state="normal")
             self.batch_button.config(state="normal")
             self.select_button.config(state="normal")
             self._set_save_buttons_state("disabled")
-            self.results_text.insert(
-                tk.END,
-                f"\nBatch done. Success: {successes}, Failed: {len(failures)}\n",
-            )
-            for name, err in failures[:10]:
-                self.results_text.insert(tk.END, f"- {name}: {err}\n")
+            lines = [f"\nBatch done. Success: {successes}, Failed: {len(failures)}\n"]
+            lines.extend(f"- {name}: {err}\n" for name, err in failures[:10])
             if len(failures) > 10:
-                self.results_text.insert(tk.END, f"... and {len(failures) - 10} more failures\n")
+                lines.append(f"... and {len(failures) - 10} more failures\n")
+            self._set_results_text("".join(lines), append=True)
 
         self.root.after(0, finish_batch)
 
-    def _process_single_file(self, filepath, mode):
-        return self._run_with_current_options(filepath, mode)
+    def _batch_file_done(self, note, value):
+        self._set_results_text(note, append=True)
+        self._request_progress(value)
 
     @staticmethod
     def _safe_float(text_var, default=0.0):
@@ -582,29 +1179,48 @@ class DiastasisGUI:
         except (ValueError, TypeError):
             return default
 
-    def _run_with_current_options(self, filepath, mode):
-        """Run the pipeline with the options currently set in the UI."""
+    @staticmethod
+    def _safe_int(int_var, default=None):
+        """Read an IntVar, falling back when its entry is blank or not an integer."""
+        try:
+            return int(int_var.get())
+        except (tk.TclError, ValueError, TypeError):
+            return default
+
+    def _validated_run_options(self):
+        """
+        _current_run_options, or None after telling the user which setting
+        is invalid. Call before disabling any controls.
+        """
+        run_options = self._current_run_options()
+        layer_settings = (
+            ("algorithm", "num_layers", "Number of Layers"),
+            ("flat_algorithm", "flat_num_layers", "Flat Number of Layers"),
+        )
+        for algorithm_key, layers_key, label in layer_settings:
+            layers = run_options[layers_key]
+            if run_options[algorithm_key] == "force_k" and (layers is None or layers <= 0):
+                messagebox.showerror("Invalid Setting", f"{label} must be a positive whole number.")
+                return None
+        return run_options
+
+    def _current_run_options(self):
+        """
+        run_diastasis keyword arguments (other than mode) from the UI state,
+        as plain values. Both the single-file and batch paths call this once
+        on the main thread and hand the dict to their worker.
+        """
         algorithm = self.algorithm.get()
         flat_algorithm = self.flat_algorithm.get()
-        flat_touch_policy = (
-            "edge_or_overlap"
-            if self.flat_touch_policy.get() == "Allow corner touching"
-            else "any_touch"
-        )
-        flat_priority_order = {
-            "Source order": "source",
-            "Largest first": "largest_first",
-            "Smallest first": "smallest_first",
-        }.get(self.flat_priority_order.get(), "source")
-
-        return run_diastasis(
-            filepath,
+        flat_touch_policy = self.FLAT_TOUCH_POLICIES.get(self.flat_touch_policy.get(), "any_touch")
+        flat_priority_order = self.FLAT_PRIORITY_ORDERS.get(self.flat_priority_order.get(), "source")
+
+        return dict(
             algorithm=algorithm,
             use_optimizer=self.use_optimizer.get(),
-            num_layers=self.num_layers.get() if algorithm == "force_k" else None,
-            mode=mode,
+            num_layers=self._safe_int(self.num_layers) if algorithm == "force_k" else None,
             flat_algorithm=flat_algorithm,
-            flat_num_layers=self.flat_num_layers.get() if flat_algorithm == "force_k" else None,
+            flat_num_layers=self._safe_int(self.flat_num_layers) if flat_algorithm == "force_k" else None,
             flat_touch_policy=flat_touch_policy,
             flat_priority_order=flat_priority_order,
             clip_visible_boundaries=self.clip_visible_boundaries.get(),
@@ -624,8 +1240,7 @@ class DiastasisGUI:
             messagebox.showerror("Error", "No processed data for this mode. Please process first.")
             return
 
-        original_filename = os.path.splitext(os.path.basename(self.filepath))[0]
-        default_filename = f"{original_filename}_{mode}_layered.svg"
+        default_filename = f"{self._file_stem}_{mode}_layered.svg"
 
         output_filepath = filedialog.asksaveasfilename(
             title="Save Layered SVG As...",
@@ -637,30 +1252,61 @@ class DiastasisGUI:
         if not output_filepath:
             return
 
-        try:
-            output_dir = os.path.dirname(output_filepath)
-            chosen_filename = os.path.basename(output_filepath)
-            base_filename = os.path.splitext(chosen_filename)[0]
+        output_dir = os.path.dirname(output_filepath)
+        chosen_filename = os.path.basename(output_filepath)
+        base_filename = os.path.splitext(chosen_filename)[0]
+        export_options = self._current_export_options()
 
-            save_layers_to_files(
+        self._save_in_background(
+            lambda: save_layers_to_files(
                 data["shapes"],
                 data["coloring"],
                 output_dir,
                 base_filename,
                 data["svg_width"],
                 data["svg_height"],
-                preserve_original_colors=self.preserve_colors.get(),
-                export_profile=self.export_profile.get(),
-            )
-
-            messagebox.showinfo("Success", f"Layered SVG saved successfully as:\n{output_filepath}")
-        except Exception as exc:
-            messagebox.showerror("Save Error", f"Error saving layers: {exc}")
+                **export_options,
+            ),
+            lambda _path: f"Layered SVG saved successfully as:\n{output_filepath}",
+            "Error saving layers",
+        )
 
     def _set_save_buttons_state(self, state):
         for button in (self.save_button, self.save_single_button, self.save_separate_button):
             button.config(state=state)
 
+    def _current_export_options(self):
+        """save_* keyword arguments from the UI state, read on the main thread."""
+        return {
+            "preserve_original_colors": self.preserve_colors.get(),
+            "export_profile": self.export_profile.get(),
+        }
+
+    def _save_in_background(self, save, success_message, error_prefix):
+        """
+        Run save() on a worker thread so writing a large SVG does not freeze
+        the window, then report on the Tk main thread. Saving is disabled
+        meanwhile.
+        """
+        self._set_save_buttons_state("disabled")
+
+        def worker():
+            try:
+                result = save()
+            except Exception as exc:
+                message = f"{error_prefix}: {exc}"
+                self.root.after(0, lambda: self._save_finished(messagebox.showerror, "Save Error", message))
+                return
+            message = success_message(result)
+            self.root.after(0, lambda: self._save_finished(messagebox.showinfo, "Success", message))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _save_finished(self, show, title, message):
+        has_result = self.results_by_mode.get(self.get_active_mode()) is not None
+        self._set_save_buttons_state("normal" if has_result else "disabled")
+        show(title, message)
+
     def save_layers_separately(self):
         mode = self.get_active_mode()
         data = self.results_by_mode.get(mode)
@@ -673,21 +1319,20 @@ class DiastasisGUI:
         if not output_dir:
             return
 
-        original_filename = os.path.splitext(os.path.basename(self.filepath))[0]
-        try:
-            written = save_layers_to_separate_files(
+        export_options = self._current_export_options()
+        self._save_in_background(
+            lambda: save_layers_to_separate_files(
                 data["shapes"],
                 data["coloring"],
                 output_dir,
-                f"{original_filename}_{mode}",
+                f"{self._file_stem}_{mode}",
                 data["svg_width"],
                 data["svg_height"],
-                preserve_original_colors=self.preserve_colors.get(),
-                export_profile=self.export_profile.get(),
-            )
-            messagebox.showinfo("Success", f"{len(written)} layer files saved to:\n{output_dir}")
-        except Exception as exc:
-            messagebox.showerror("Save Error", f"Error saving layer files: {exc}")
+                **export_options,
+            ),
+            lambda written: f"{len(written)} layer files saved to:\n{output_dir}",
+            "Error saving layer files",
+        )
 
     def save_single_layer(self):
         mode = self.get_active_mode()
@@ -697,8 +1342,7 @@ class DiastasisGUI:
             messagebox.showerror("Error", "No processed data for this mode. Please process first.")
             return
 
-        original_filename = os.path.splitext(os.path.basename(self.filepath))[0]
-        default_filename = f"{original_filename}_{mode}_clipped_single.svg"
+        default_filename = f"{self._file_stem}_{mode}_clipped_single.svg"
 
         output_filepath = filedialog.asksaveasfilename(
             title="Save Clipped 1-Layer SVG As...",
@@ -710,17 +1354,16 @@ class DiastasisGUI:
         if not output_filepath:
             return
 
-        try:
-            save_single_layer_file(
+        self._save_in_background(
+            lambda: save_single_layer_file(
                 data["shapes"],
                 output_filepath,
                 data["svg_width"],
                 data["svg_height"],
-            )
-            messagebox.showinfo("Success", f"Single-layer SVG saved successfully as:\n{output_filepath}")
-        except Exception as exc:
-            messagebox.showerror("Save Error", f"Error saving single-layer SVG: {exc}")
-
+            ),
+            lambda _path: f"Single-layer SVG saved successfully as:\n{output_filepath}",
+            "Error saving single-layer SVG",
+        )
 
 def launch():
     root = tk.Tk()
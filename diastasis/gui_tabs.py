@@ -47,10 +47,11 @@ def build_overlaid_tab(app):
 
     explanation_frame = ttk.LabelFrame(app.overlaid_tab, text="Algorithm Guide")
     explanation_frame.pack(fill=tk.X, padx=4, pady=(0, 6))
-    for algo, explanation in OVERLAID_ALGO_GUIDE.items():
-        ttk.Label(
-            explanation_frame, text=f"- {algo}: {explanation}", wraplength=410, justify=tk.LEFT
-        ).pack(anchor=tk.W, padx=6, pady=1)
+    # One wrapped label for the whole guide rather than one widget per entry.
+    guide_text = "\n".join(f"- {algo}: {explanation}" for algo, explanation in OVERLAID_ALGO_GUIDE.items())
+    ttk.Label(
+        explanation_frame, text=guide_text, wraplength=410, justify=tk.LEFT
+    ).pack(anchor=tk.W, padx=6, pady=3)
 
 
 def build_flat_tab(app):
@@ -75,7 +76,7 @@ def build_flat_tab(app):
     ttk.Label(policy_frame, text="Touch Policy:").pack(side=tk.LEFT, padx=(0, 8))
     app.flat_policy_combobox = ttk.Combobox(
         policy_frame, textvariable=app.flat_touch_policy,
-        values=["No edge/corner touching", "Allow corner touching"], state="readonly", width=24,
+        values=list(app.FLAT_TOUCH_POLICIES), state="readonly", width=24,
     )
     app.flat_policy_combobox.pack(side=tk.LEFT)
 
@@ -84,7 +85,7 @@ def build_flat_tab(app):
     ttk.Label(priority_frame, text="Overlap Priority:").pack(side=tk.LEFT, padx=(0, 8))
     app.flat_priority_combobox = ttk.Combobox(
         priority_frame, textvariable=app.flat_priority_order,
-        values=["Source order", "Largest first", "Smallest first"], state="readonly", width=24,
+        values=list(app.FLAT_PRIORITY_ORDERS), state="readonly", width=24,
     )
     app.flat_priority_combobox.pack(side=tk.LEFT)
 
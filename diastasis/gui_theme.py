@@ -46,16 +46,13 @@ def apply_non_macos_theme(app) -> None:
     colors = theme_colors(app._theme_mode)
 
     app.root.configure(bg=colors["bg"])
+    # Frames, labels, labelframes and checkbuttons inherit these from the root
+    # style; only the styles that differ from it get their own Tcl call.
     app.style.configure(".", background=colors["bg"], foreground=colors["fg"])
-    app.style.configure("TFrame", background=colors["bg"])
-    app.style.configure("TLabel", background=colors["bg"], foreground=colors["fg"])
-    app.style.configure("TLabelframe", background=colors["bg"], foreground=colors["fg"])
-    app.style.configure("TLabelframe.Label", background=colors["bg"], foreground=colors["fg"])
-    app.style.configure("TCheckbutton", background=colors["bg"], foreground=colors["fg"])
-    app.style.configure("TButton", background=colors["surface"], foreground=colors["fg"])
+    app.style.configure("TButton", background=colors["surface"])
     app.style.map("TButton", background=[("active", colors["active"])])
-    app.style.configure("TNotebook", background=colors["bg"], borderwidth=0)
-    app.style.configure("TNotebook.Tab", background=colors["surface"], foreground=colors["fg"])
+    app.style.configure("TNotebook", borderwidth=0)
+    app.style.configure("TNotebook.Tab", background=colors["surface"])
     app.style.map(
         "TNotebook.Tab",
         background=[("selected", colors["active"])],
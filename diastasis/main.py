@@ -1,8 +1,11 @@
 from collections import defaultdict
 from typing import Dict, List, Optional, Tuple
 import networkx as nx
+import numpy as np
+import shapely
 from rtree import index
 from shapely.ops import unary_union
+from shapely.strtree import STRtree
 from shapely.validation import make_valid
 from .color_utils import color_distance, parse_color, rgb_to_hex
 from .graph_solver import GraphSolver
@@ -25,12 +28,12 @@ def build_flat_conflict_graph(shapes, geo_engine, touch_policy="any_touch"):
     Build the flat-mode conflict graph where edges mean "cannot share layer".
     """
     graph = nx.Graph()
-    graph.add_nodes_from((i, {"size": shape.geometry.area}) for i, shape in enumerate(shapes))
-
-    for i, j in geo_engine.detect_contacts(shapes, touch_policy=touch_policy):
-        # Unweighted adjacency is enough for flat separation.
-        graph.add_edge(i, j, weight=1.0)
-
+    geometries = np.fromiter((shape.geometry for shape in shapes), dtype=object, count=len(shapes))
+    graph.add_nodes_from((i, {"size": area}) for i, area in enumerate(shapely.area(geometries).tolist()))
+    # Unweighted adjacency is enough for flat separation: edges carry no
+    # attributes (force_k reads a missing weight as 1.0), which skips a
+    # weight entry per edge in the bulk insert.
+    graph.add_edges_from(geo_engine.detect_contacts(shapes, touch_policy=touch_policy))
     return graph
 
 
@@ -46,11 +49,12 @@ def flat_conflict_count(graph, coloring):
     """
     Count conflicting adjacency edges assigned to the same layer.
     """
-    conflicts = 0
-    for u, v in graph.edges():
-        if coloring.get(u) == coloring.get(v):
-            conflicts += 1
-    return conflicts
+    same_color_ends = 0
+    for node, neighbors in graph.adj.items():
+        # map + count compare a node's whole neighborhood at C speed.
+        same_color_ends += list(map(coloring.get, neighbors)).count(coloring.get(node))
+    # Conflict graphs have no self-loops, so each edge was seen from both ends.
+    return same_color_ends // 2
 
 
 def _sanitize_geometry(geometry):
@@ -102,12 +106,46 @@ def _subtract_covered_area(geometry, placed_geometries, placed_index):
     candidate_ids = list(placed_index.intersection(geometry.bounds))
     if not candidate_ids:
         return geometry
+    candidates = [placed_geometries[i] for i in candidate_ids]
+    try:
+        # One vectorized test drops pieces that only share a bounding box,
+        # so the union below covers just what can actually be subtracted.
+        candidates = [
+            candidate
+            for candidate, hit in zip(candidates, shapely.intersects(geometry, candidates).tolist())
+            if hit
+        ]
+    except Exception:
+        pass
+    if not candidates:
+        return geometry
+    return _subtract_geometries(geometry, candidates)
+
+
+def _subtract_geometries(geometry, masks):
+    """
+    geometry minus the union of masks. Inputs are expected to be sanitized
+    already, so validity is only re-checked when GEOS raises.
+    """
+    return _difference(geometry, _union_geometries(masks))
+
+
+def _difference(geometry, mask):
+    if mask is None:
+        return geometry
+    try:
+        return geometry.difference(mask)
+    except Exception:
+        return _safe_difference(geometry, mask)
+
+
+def _union_geometries(geometries):
+    """Union of geometries, pairwise with repair when the batched union fails; None if nothing unions."""
     try:
-        mask = unary_union([placed_geometries[i] for i in candidate_ids])
+        mask = unary_union(geometries)
     except Exception:
         mask = None
-        for i in candidate_ids:
-            candidate = placed_geometries[i]
+        for candidate in geometries:
             if mask is None:
                 mask = candidate
                 continue
@@ -119,7 +157,7 @@ def _subtract_covered_area(geometry, placed_geometries, placed_index):
                 except Exception:
                     # Skip an un-unionable geometry rather than crash the run.
                     continue
-    return _safe_difference(geometry, mask)
+    return mask
 
 
 def clip_shapes_to_visible_boundaries(shapes):
@@ -127,32 +165,49 @@ def clip_shapes_to_visible_boundaries(shapes):
     Clip each shape to its visible area according to SVG paint order.
     Later elements are considered on top of earlier ones.
     """
-    visible_by_index = {}
-    occluder_geometries = []
-    occluder_index = index.Index()
-
-    # Traverse top-to-bottom (reverse source order).
-    for idx in range(len(shapes) - 1, -1, -1):
-        shape = shapes[idx]
-        occluder = _sanitize_geometry(shape.geometry)
-        if occluder is None or occluder.is_empty:
-            continue
-        geometry = _subtract_covered_area(occluder, occluder_geometries, occluder_index)
-
-        if not geometry.is_empty:
-            geometry = _sanitize_geometry(geometry)
-            if not geometry.is_empty:
-                visible_by_index[idx] = geometry
-
-        if occluder is not None and not occluder.is_empty:
-            occluder_index.insert(len(occluder_geometries), occluder.bounds)
-            occluder_geometries.append(occluder)
+    geometries = np.fromiter((shape.geometry for shape in shapes), dtype=object, count=len(shapes))
+    # One vectorized validity pass; only invalid (or missing) geometries go through repair.
+    occluders = [
+        geometry if valid else _sanitize_geometry(geometry)
+        for geometry, valid in zip(geometries.tolist(), shapely.is_valid(geometries).tolist())
+    ]
+    # Occluders are the unclipped shapes, so one bulk-loaded tree and a single
+    # query find every shape's coverers (STRtree skips None/empty entries).
+    tree = STRtree(occluders)
+    try:
+        shape_ids, occluder_ids = tree.query(occluders, predicate="intersects")
+    except Exception:
+        # A geometry that could not be repaired; bounding boxes still prune.
+        shape_ids, occluder_ids = tree.query(occluders)
+    covered_by = defaultdict(list)
+    for idx, occluder_id in zip(shape_ids.tolist(), occluder_ids.tolist()):
+        # Only later (painted on top) shapes hide this one.
+        if occluder_id > idx:
+            covered_by[idx].append(occluder_id)
+
+    # Each shape's clip is independent of the others', so all differences run in one call.
+    covered_ids = list(covered_by)
+    targets = [occluders[idx] for idx in covered_ids]
+    masks = [_union_geometries([occluders[i] for i in covered_by[idx]]) for idx in covered_ids]
+    try:
+        differences = shapely.difference(targets, masks).tolist()
+    except Exception:
+        differences = [_difference(target, mask) for target, mask in zip(targets, masks)]
+    # A mask that failed to union (None) leaves its target as is.
+    visible = {
+        idx: target if difference is None else difference
+        for idx, target, difference in zip(covered_ids, targets, differences)
+    }
 
     clipped_shapes = []
     for idx, shape in enumerate(shapes):
-        geometry = visible_by_index.get(idx)
+        geometry = visible.get(idx, occluders[idx])
         if geometry is None or geometry.is_empty:
             continue
+        if idx in visible:
+            geometry = _sanitize_geometry(geometry)
+            if geometry.is_empty:
+                continue
         clipped_shapes.append(
             Shape(
                 id=len(clipped_shapes),
@@ -262,6 +317,8 @@ def simplify_shapes_for_performance(
 def estimate_processing_complexity(svg_filepath):
     """
     Return a lightweight complexity estimate for UI/UX guidance.
+    svg_filepath may also be a binary file object, e.g. io.BytesIO over
+    SVG bytes already in memory.
     """
     parser = SVGParser()
     shapes, _, _ = parser.load_svg(svg_filepath)
@@ -317,9 +374,18 @@ def build_flat_coloring(shapes, geo_engine, algorithm="minimum_layers", num_laye
     return build_flat_coloring_from_graph(graph, algorithm=algorithm, num_layers=num_layers)
 
 
-def build_flat_coloring_from_graph(graph, algorithm="minimum_layers", num_layers=None):
+def build_flat_coloring_from_graph(
+    graph, algorithm="minimum_layers", num_layers=None, progress_callback=None, lower_bound=None
+):
     solver = GraphSolver()
-    return solver.solve_coloring(graph, algorithm=algorithm, use_optimizer=False, num_layers=num_layers)
+    return solver.solve_coloring(
+        graph,
+        algorithm=algorithm,
+        use_optimizer=False,
+        num_layers=num_layers,
+        progress_callback=progress_callback,
+        lower_bound=lower_bound,
+    )
 
 
 def drop_sliver_fragments(shapes, canvas_area, min_area_ratio):
@@ -514,35 +580,38 @@ def _safe_unary_union(geometries):
             return merged
 
 
+def _group_by_layer(coloring: Dict[int, int]) -> Dict[int, List[int]]:
+    """Invert shape_id -> color_id into color_id -> shape ids, in one pass."""
+    grouped_coloring = defaultdict(list)
+    for shape_id, color_id in coloring.items():
+        grouped_coloring[color_id].append(shape_id)
+    return grouped_coloring
+
+
 def _layer_breakdown_summary(
     shapes: List[Shape],
-    coloring: Dict[int, int],
+    grouped_coloring: Dict[int, List[int]],
     canvas_area: float,
     row_label: str = "Color",
 ) -> str:
     """Tiny-fragment count and per-layer area share, shared by all modes."""
-    layer_counts: Dict[int, int] = defaultdict(int)
-    for color_id in coloring.values():
-        layer_counts[color_id] += 1
+    # Each area is computed once; layer sizes come from the grouping itself.
+    areas = [None if shape.geometry is None else shape.geometry.area for shape in shapes]
+    layer_areas = {
+        color_id: sum(areas[shape_id] for shape_id in shape_ids if areas[shape_id] is not None)
+        for color_id, shape_ids in grouped_coloring.items()
+    }
 
-    total_area = sum((shape.geometry.area if shape.geometry else 0.0) for shape in shapes)
+    total_area = sum(area for area in areas if area is not None)
     tiny_threshold = canvas_area * 0.0002 if canvas_area > 0 else 0.01
-    tiny_count = sum(
-        1 for shape in shapes
-        if shape.geometry is not None and shape.geometry.area < tiny_threshold
-    )
+    tiny_count = sum(1 for area in areas if area is not None and area < tiny_threshold)
 
     text = f"Tiny fragments (<{tiny_threshold:.3f} area): {tiny_count}\n"
     text += "Layer area share:\n"
-    for color_id in sorted(layer_counts):
-        text += f"{row_label} {color_id}: {layer_counts[color_id]} shapes\n"
+    for color_id in sorted(grouped_coloring):
+        text += f"{row_label} {color_id}: {len(grouped_coloring[color_id])} shapes\n"
         if total_area > 0:
-            layer_area = sum(
-                shapes[sid].geometry.area
-                for sid in coloring
-                if coloring[sid] == color_id and shapes[sid].geometry is not None
-            )
-            text += f"  Area share: {(layer_area / total_area) * 100:.1f}%\n"
+            text += f"  Area share: {(layer_areas[color_id] / total_area) * 100:.1f}%\n"
     return text
 
 
@@ -564,9 +633,22 @@ def run_diastasis(
     color_tolerance=0.0,
     unify_plate_colors=False,
     merge_fragments=False,
+    progress_callback=None,
 ):
+    # svg_filepath may also be a binary file object, as for
+    # estimate_processing_complexity.
+    # progress_callback(stage, fraction) is called at real pipeline milestones.
+    def report(stage, fraction):
+        if progress_callback is not None:
+            progress_callback(stage, fraction)
+
+    def report_coloring(fraction):
+        # The solver's own phases fill the span between "graph" and "colored".
+        report("coloring", 0.5 + 0.3 * fraction)
+
     parser = SVGParser(include_strokes=include_strokes)
     shapes, svg_width, svg_height = parser.load_svg(svg_filepath)
+    report("parsed", 0.1)
 
     if not shapes:
         return None, None, "No shapes found in SVG."
@@ -589,6 +671,7 @@ def run_diastasis(
         if not shapes:
             return None, None, "No visible shapes remain after visibility clipping."
 
+    report("prepared", 0.25)
     geo_engine = GeometryEngine(use_spatial_index=True)
     canvas_area = float(svg_width or 0) * float(svg_height or 0)
 
@@ -596,19 +679,17 @@ def run_diastasis(
         coloring, representatives, unresolved_count = separate_by_color(
             shapes, tolerance=color_tolerance
         )
+        report("colored", 0.8)
         if unify_plate_colors:
             shapes = apply_plate_colors(shapes, coloring, representatives)
 
-        grouped_coloring = defaultdict(list)
-        for shape_id, plate_id in coloring.items():
-            grouped_coloring[plate_id].append(shape_id)
+        grouped_coloring = _group_by_layer(coloring)
 
         # Consolidate before reporting so plate counts match the output files.
         merged_note = ""
         if merge_fragments:
             before = len(shapes)
             shapes, grouped_coloring, _ = merge_same_color_fragments(shapes, grouped_coloring)
-            coloring = {sid: pid for pid, sids in grouped_coloring.items() for sid in sids}
             merged_note = f"Same-color fragments merged: {before} -> {len(shapes)} shapes\n"
 
         num_plates = len(grouped_coloring)
@@ -631,15 +712,13 @@ def run_diastasis(
         summary += merged_note
 
         summary += "\nPlate inks:\n"
-        plate_counts: Dict[int, int] = defaultdict(int)
-        for plate_id in coloring.values():
-            plate_counts[plate_id] += 1
         for plate_id in sorted(representatives):
             ink = representatives[plate_id] if representatives[plate_id] is not None else "(no fill)"
-            summary += f"  Plate {plate_id}: {ink} — {plate_counts[plate_id]} shapes\n"
+            summary += f"  Plate {plate_id}: {ink} — {len(grouped_coloring.get(plate_id, ()))} shapes\n"
         summary += "\n"
-        summary += _layer_breakdown_summary(shapes, coloring, canvas_area, row_label="Plate")
+        summary += _layer_breakdown_summary(shapes, grouped_coloring, canvas_area, row_label="Plate")
 
+        report("done", 1.0)
         return shapes, grouped_coloring, summary, svg_width, svg_height
 
     if mode == "flat":
@@ -654,11 +733,17 @@ def run_diastasis(
             return None, None, "No shapes remain after sliver cleanup."
 
         graph = build_flat_conflict_graph(shapes, geo_engine, touch_policy=flat_touch_policy)
+        # The summary reports this bound too; computing it once spares a
+        # second clique search, which dominates on dense graphs.
+        lower_bound = flat_layer_lower_bound(graph)
+        report("graph", 0.5)
 
         coloring = build_flat_coloring_from_graph(
             graph,
             algorithm=flat_algorithm,
             num_layers=flat_num_layers,
+            progress_callback=report_coloring,
+            lower_bound=lower_bound,
         )
     else:
         # For weaker systems, skip overlap area calculations unless force_k needs them.
@@ -671,19 +756,29 @@ def run_diastasis(
         solver = GraphSolver()
         # Build the weighted networkx graph
         graph = solver.build_overlap_graph(shapes, overlaps)
+        lower_bound = flat_layer_lower_bound(graph)
+        report("graph", 0.5)
 
         # Call solve_coloring with the new parameters
-        coloring = solver.solve_coloring(graph, algorithm=algorithm, use_optimizer=use_optimizer, num_layers=num_layers)
+        coloring = solver.solve_coloring(
+            graph,
+            algorithm=algorithm,
+            use_optimizer=use_optimizer,
+            num_layers=num_layers,
+            progress_callback=report_coloring,
+            lower_bound=lower_bound,
+        )
 
         # --- Identify and separate the largest shape (background) ---
-        largest_shape_id = -1
-        max_area = -1
-        for i, shape in enumerate(shapes):
-            if shape.geometry and shape.geometry.area > max_area:
-                max_area = shape.geometry.area
-                largest_shape_id = i
+        # One vectorized area pass; argmax keeps the first of equal areas, as
+        # the strict > scan did. Missing and empty geometries never qualify.
+        geometries = np.fromiter((shape.geometry for shape in shapes), dtype=object, count=len(shapes))
+        areas = shapely.area(geometries)
+        areas[np.isnan(areas) | shapely.is_empty(geometries)] = -1.0
+        largest_shape_id = int(areas.argmax()) if areas.size and areas.max() >= 0 else -1
 
         background_separated = False
+        rest_lower_bound = None
         if largest_shape_id in coloring:
             background_color = coloring[largest_shape_id]
             shares_layer = any(
@@ -700,8 +795,12 @@ def run_diastasis(
                     rest_graph = graph.subgraph(
                         node for node in graph.nodes() if node != largest_shape_id
                     )
+                    rest_lower_bound = flat_layer_lower_bound(rest_graph)
                     rest_coloring = solver.solve_coloring(
-                        rest_graph, algorithm=algorithm, use_optimizer=use_optimizer
+                        rest_graph,
+                        algorithm=algorithm,
+                        use_optimizer=use_optimizer,
+                        lower_bound=rest_lower_bound,
                     )
                     if rest_coloring:
                         recolored = {
@@ -714,7 +813,10 @@ def run_diastasis(
                 background_separated = True
         # --- End of largest shape separation ---
 
-    num_colors = len(set(coloring.values()))
+    report("colored", 0.8)
+    # One inversion serves the layer count, the breakdown and the return value.
+    grouped_coloring = _group_by_layer(coloring)
+    num_colors = len(grouped_coloring)
     mode_label = "Flat Complexity" if mode == "flat" else "Overlaid Complexity"
     summary = f"Processing complete ({mode_label}). Used {num_colors} layers.\n"
     summary += f"Visible boundary clipping: {'Enabled' if clip_visible_boundaries else 'Disabled'}\n"
@@ -737,7 +839,6 @@ def run_diastasis(
         summary += f"Flat overlap priority: {priority_label}\n"
         if min_fragment_ratio > 0:
             summary += f"Sliver fragments dropped: {dropped_slivers} (< {min_fragment_ratio:.4%} of canvas)\n"
-        lower_bound = flat_layer_lower_bound(graph)
         summary += f"Flat minimum proven required layers: {lower_bound}\n"
         if num_colors == lower_bound:
             summary += "Layer count is provably optimal.\n"
@@ -748,14 +849,14 @@ def run_diastasis(
                 f"Flat conflict pairs introduced: {conflicts}\n"
             )
     else:
-        lower_bound = flat_layer_lower_bound(graph)
         if background_separated:
             # A dedicated background layer needs chi(rest) + 1 layers, so the
             # sound bound is max(clique(G), clique(G without background) + 1).
-            rest_graph = graph.subgraph(
-                node for node in graph.nodes() if node != largest_shape_id
-            )
-            constrained_bound = max(lower_bound, flat_layer_lower_bound(rest_graph) + 1)
+            if rest_lower_bound is None:
+                rest_lower_bound = flat_layer_lower_bound(
+                    graph.subgraph(node for node in graph.nodes() if node != largest_shape_id)
+                )
+            constrained_bound = max(lower_bound, rest_lower_bound + 1)
             summary += f"Minimum proven required layers (dedicated background): {constrained_bound}\n"
             if num_colors == lower_bound:
                 summary += "Layer count is provably optimal.\n"
@@ -766,17 +867,6 @@ def run_diastasis(
             if num_colors == lower_bound:
                 summary += "Layer count is provably optimal.\n"
     summary += "\n"
-    color_counts = defaultdict(int)
-    for color_id in coloring.values():
-        color_counts[color_id] += 1
-
-    total_area = sum((shape.geometry.area if shape.geometry else 0.0) for shape in shapes)
-    tiny_threshold = canvas_area * 0.0002 if canvas_area > 0 else 0.01
-    tiny_count = sum(
-        1 for shape in shapes
-        if shape.geometry is not None and shape.geometry.area < tiny_threshold
-    )
-
     if mode == "flat":
         overlap_metric = graph.number_of_edges()
         summary += f"Flat conflict graph edges: {overlap_metric}\n"
@@ -784,29 +874,13 @@ def run_diastasis(
         overlap_metric = len(overlaps)
         summary += f"Overlaid overlap pairs detected: {overlap_metric}\n"
 
-    summary += f"Tiny fragments (<{tiny_threshold:.3f} area): {tiny_count}\n"
-    summary += "Layer area share:\n"
-
-    for color_id in sorted(color_counts.keys()):
-        count = color_counts[color_id]
-        summary += f"Color {color_id}: {count} shapes\n"
-        if total_area > 0:
-            layer_area = sum(
-                shapes[sid].geometry.area
-                for sid in coloring.keys()
-                if coloring[sid] == color_id and shapes[sid].geometry is not None
-            )
-            summary += f"  Area share: {(layer_area / total_area) * 100:.1f}%\n"
-
-    # Invert coloring to group shapes by color_id for saving
-    grouped_coloring = defaultdict(list)
-    for shape_id, color_id in coloring.items():
-        grouped_coloring[color_id].append(shape_id)
+    summary += _layer_breakdown_summary(shapes, grouped_coloring, canvas_area)
 
     if merge_fragments:
         shapes, grouped_coloring, before = merge_same_color_fragments(shapes, grouped_coloring)
         summary += f"Same-color fragments merged: {before} -> {len(shapes)} shapes\n"
 
+    report("done", 1.0)
     return shapes, grouped_coloring, summary, svg_width, svg_height # Updated return values
 
 
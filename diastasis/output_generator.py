@@ -1,8 +1,9 @@
 from typing import List, Dict
 from .svg_parser import Shape
 import os
-import random
+from xml.sax.saxutils import escape, quoteattr
 from shapely.geometry import MultiPolygon
+from .svg_export import build_layer_color_map
 
 class OutputGenerator:
     def create_layer_files(self, shapes: List[Shape], coloring: Dict[int, int], output_dir: str, original_filename: str):
@@ -14,13 +15,13 @@ class OutputGenerator:
             return
 
         num_layers = max(coloring.values()) + 1
+        color_map = build_layer_color_map(range(num_layers))
         for layer_num in range(num_layers):
             layer_shapes = [shapes[i] for i, color in coloring.items() if color == layer_num]
             
-            # Generate a random color for the layer
-            r = random.randint(0, 255)
-            g = random.randint(0, 255)
-            b = random.randint(0, 255)
+            # Same deterministic palette as the main exporter, so re-runs give identical files
+            hex_color = color_map[layer_num]
+            r, g, b = (int(hex_color[i:i + 2], 16) for i in (1, 3, 5))
             layer_color = f"fill:rgb({r},{g},{b});"
 
             svg_content = self.generate_svg_layer(layer_shapes, layer_num, shapes, layer_color, original_filename)
@@ -58,7 +59,11 @@ class OutputGenerator:
         transform = shape.metadata.get('transform', '')
         # Include the original ID
         shape_id = shape.metadata.get('id', '')
-        return f'<path d="{path_data}" style="{style}" transform="{transform}" id="{shape_id}" />'
+        # Style, transform and id come from the input file, so escape them on the way out
+        return (
+            f'<path d="{path_data}" style={quoteattr(style)} '
+            f'transform={quoteattr(transform)} id={quoteattr(shape_id)} />'
+        )
 
     def add_registration_marks(self, shapes: List[Shape], layer_name: str) -> List[str]:
         """Adds registration marks to the SVG."""
@@ -98,7 +103,7 @@ class OutputGenerator:
         reg_mark8 = f'<line x1="{max_x}" y1="{max_y - cross_size}" x2="{max_x}" y2="{max_y + cross_size}" stroke="black" />'
         
         # Add layer name
-        layer_name_text = f'<text x="{min_x}" y="{min_y - cross_size - 5}" font-family="Arial" font-size="10" fill="black">{layer_name}</text>'
+        layer_name_text = f'<text x="{min_x}" y="{min_y - cross_size - 5}" font-family="Arial" font-size="10" fill="black">{escape(layer_name)}</text>'
 
         return [reg_mark1, reg_mark2, reg_mark3, reg_mark4, reg_mark5, reg_mark6, reg_mark7, reg_mark8, layer_name_text]
 
@@ -6,9 +6,12 @@ or a generated path, in that order.
 import colorsys
 import os
 import re
-from typing import Dict, Iterable, List, Optional, Tuple
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from xml.sax.saxutils import quoteattr
 
+import numpy as np
+import shapely
 from shapely.geometry import GeometryCollection, MultiPolygon, Polygon
 
 from .svg_parser import Shape
@@ -58,39 +61,79 @@ def polygon_to_svg_path_d(polygon, precision: int = 3) -> str:
     for poly in polygons:
         if poly.is_empty:
             continue
-
-        # Exterior ring
-        exterior_coords = poly.exterior.coords
-        if exterior_coords:
-            path_data.append(f"M {exterior_coords[0][0]:.{precision}f} {exterior_coords[0][1]:.{precision}f}")
-            for x, y in exterior_coords[1:]:
-                path_data.append(f"L {x:.{precision}f} {y:.{precision}f}")
-            path_data.append("Z")
-
-        # Interior rings (holes)
-        for interior_ring in poly.interiors:
-            interior_coords = interior_ring.coords
-            if interior_coords:
-                path_data.append(f"M {interior_coords[0][0]:.{precision}f} {interior_coords[0][1]:.{precision}f}")
-                for x, y in interior_coords[1:]:
-                    path_data.append(f"L {x:.{precision}f} {y:.{precision}f}")
-                path_data.append("Z")
+        # Exterior ring, then interior rings (holes)
+        for ring in (poly.exterior, *poly.interiors):
+            ring_d = _ring_path_d(ring, precision)
+            if ring_d:
+                path_data.append(ring_d)
 
     return " ".join(path_data)
 
 
-# Helper function to generate SVG crop marks
+def _polygon_path_ds(geometries: List, precision: int = 3) -> List[str]:
+    """
+    polygon_to_svg_path_d for many geometries at once: parts, rings and
+    coordinates come from one shapely call each instead of several per
+    shape, which dominates for the small polygons typical of artwork.
+    """
+    geometries = np.fromiter(geometries, dtype=object, count=len(geometries))
+    parts, owners = shapely.get_parts(geometries, return_index=True)
+    # Only direct polygon members are drawn, as in polygon_to_svg_path_d.
+    is_polygon = shapely.get_type_id(parts) == shapely.GeometryType.POLYGON
+    rings, ring_parts = shapely.get_rings(parts[is_polygon], return_index=True)
+    coords, coord_rings = shapely.get_coordinates(rings, return_index=True)
+    ring_sizes = np.bincount(coord_rings, minlength=len(rings)).tolist()
+    ring_owners = owners[is_polygon][ring_parts].tolist()
+
+    point = f"%.{precision}f %.{precision}f"
+    templates = [[] for _ in range(len(geometries))]
+    value_counts = [0] * len(geometries)
+    for owner, size in zip(ring_owners, ring_sizes):
+        if size:
+            templates[owner].append(f"M {point}" + f" L {point}" * (size - 1) + " Z")
+            value_counts[owner] += 2 * size
+
+    values = coords.ravel()
+    path_ds = []
+    start = 0
+    for template, count in zip(templates, value_counts):
+        end = start + count
+        path_ds.append(" ".join(template) % tuple(values[start:end].tolist()) if template else "")
+        start = end
+    return path_ds
+
+
+def _ring_path_d(ring, precision: int) -> str:
+    """'M x y L x y ... Z' for one ring, formatted in a single % call."""
+    coords = shapely.get_coordinates(ring)
+    if not len(coords):
+        return ""
+    # One template for the whole ring instead of one f-string per vertex;
+    # %.Nf formats exactly like the :.Nf spec.
+    template = f"M %.{precision}f %.{precision}f" + f" L %.{precision}f %.{precision}f" * (len(coords) - 1)
+    return template % tuple(coords.ravel().tolist()) + " Z"
+
+
+# Corner crop marks: top-left, top-right, bottom-left, bottom-right.
+_CROP_MARK = '<path d="{}" stroke="black" stroke-width="0.5" fill="none"/>'
+_CROP_MARKS_TEMPLATE = "\n".join(
+    _CROP_MARK.format(d)
+    for d in (
+        "M 0 {m} L 0 0 L {m} 0",
+        "M {wm} 0 L {w} 0 L {w} {m}",
+        "M 0 {hm} L 0 {h} L {m} {h}",
+        "M {wm} {h} L {w} {h} L {w} {hm}",
+    )
+)
+
+
 def generate_crop_marks_svg(width: float, height: float, mark_length: float = 10) -> str:
-    marks_svg = []
-    # Top-left corner
-    marks_svg.append(f'<path d="M 0 {mark_length} L 0 0 L {mark_length} 0" stroke="black" stroke-width="0.5" fill="none"/>')
-    # Top-right corner
-    marks_svg.append(f'<path d="M {width - mark_length} 0 L {width} 0 L {width} {mark_length}" stroke="black" stroke-width="0.5" fill="none"/>')
-    # Bottom-left corner
-    marks_svg.append(f'<path d="M 0 {height - mark_length} L 0 {height} L {mark_length} {height}" stroke="black" stroke-width="0.5" fill="none"/>')
-    # Bottom-right corner
-    marks_svg.append(f'<path d="M {width - mark_length} {height} L {width} {height} L {width} {height - mark_length}" stroke="black" stroke-width="0.5" fill="none"/>')
-    return "\n".join(marks_svg)
+    return _CROP_MARKS_TEMPLATE.format(
+        w=width, h=height, m=mark_length, wm=width - mark_length, hm=height - mark_length
+    )
+
+
+_STYLE_FILL = re.compile(r"(?:^|;)\s*fill\s*:\s*([^;]+)", re.IGNORECASE)
 
 
 def get_shape_fill(shape: Shape, fallback_color: Optional[str] = "#CCCCCC") -> Optional[str]:
@@ -109,7 +152,7 @@ def get_shape_fill(shape: Shape, fallback_color: Optional[str] = "#CCCCCC") -> O
         return fill_attr
 
     style = metadata.get("style") or ""
-    style_match = re.search(r"(?:^|;)\s*fill\s*:\s*([^;]+)", style, flags=re.IGNORECASE)
+    style_match = _STYLE_FILL.search(style)
     if style_match:
         style_fill = style_match.group(1).strip()
         if style_fill.lower() not in ("none", "transparent"):
@@ -124,19 +167,56 @@ def shape_element_markup(shape: Shape, fill: str, path_precision: int = 3) -> Op
     original path data, original native element, or a generated path.
     All values sourced from the input SVG are escaped before re-emission.
     """
+    return _shape_markup(shape, _attr(fill), path_precision)
+
+
+def _shape_markup(
+    shape: Shape, quoted_fill: str, path_precision: int, path_d: Optional[str] = None
+) -> Optional[str]:
+    """
+    shape_element_markup with the fill already quoted, so callers can quote
+    each color once, and optionally the generated path data already built.
+    """
     if shape.d_attribute:
-        return f'<path d={_attr(shape.d_attribute)} fill={_attr(fill)} stroke="none"/>'
+        return f'<path d={_attr(shape.d_attribute)} fill={quoted_fill} stroke="none"/>'
 
     native = getattr(shape, "native_shape", None)
     if native and native.get("attrs"):
         attrs = " ".join(f'{name}={_attr(value)}' for name, value in native["attrs"].items())
-        return f'<{native["tag"]} {attrs} fill={_attr(fill)} stroke="none"/>'
+        return f'<{native["tag"]} {attrs} fill={quoted_fill} stroke="none"/>'
 
-    path_d = polygon_to_svg_path_d(shape.geometry, precision=path_precision)
+    if path_d is None:
+        path_d = polygon_to_svg_path_d(shape.geometry, precision=path_precision)
     if not path_d:
         return None
     # Generated paths encode holes as extra subpaths; even-odd makes them render.
-    return f'<path d="{path_d}" fill={_attr(fill)} fill-rule="evenodd" stroke="none"/>'
+    return f'<path d="{path_d}" fill={quoted_fill} fill-rule="evenodd" stroke="none"/>'
+
+
+def _generated_path_ds(shapes: List[Shape], path_precision: int) -> List[Optional[str]]:
+    """
+    Path data for each shape that _shape_markup will emit as a generated
+    path, built in one batch; None for shapes that keep source markup.
+    Results are memoized on the shape while its geometry object and the
+    precision stay the same.
+    """
+    path_ds: List[Optional[str]] = [None] * len(shapes)
+    generated = []
+    for position, shape in enumerate(shapes):
+        native = getattr(shape, "native_shape", None)
+        if shape.d_attribute or (native and native.get("attrs")):
+            continue
+        cached = getattr(shape, "_d_cache", None)
+        if cached is not None and cached[0] is shape.geometry and cached[1] == path_precision:
+            path_ds[position] = cached[2]
+        else:
+            generated.append(position)
+    batch = _polygon_path_ds([shapes[position].geometry for position in generated], path_precision)
+    for position, path_d in zip(generated, batch):
+        shape = shapes[position]
+        shape._d_cache = (shape.geometry, path_precision, path_d)
+        path_ds[position] = path_d
+    return path_ds
 
 
 GOLDEN_RATIO_CONJUGATE = 0.618033988749895
@@ -160,13 +240,18 @@ def build_layer_color_map(color_ids: Iterable[int]) -> Dict[int, str]:
     return color_map
 
 
-def _svg_document(width, height, body: str, profile: str, extra_attrs: str = "") -> str:
-    return (
-        f'<svg width="{width}" height="{height}" viewBox="0 0 {width} {height}" '
-        f'xmlns="http://www.w3.org/2000/svg" data-export-profile="{profile}"{extra_attrs}>\n'
-        f"{body}"
-        "</svg>\n"
-    )
+_SVG_OPEN_TAG = (
+    '<svg width="{w}" height="{h}" viewBox="0 0 {w} {h}" '
+    'xmlns="http://www.w3.org/2000/svg" data-export-profile="{profile}"{extra}>\n'
+)
+_SINGLE_LAYER_HEADER = (
+    '<svg width="{w}" height="{h}" viewBox="0 0 {w} {h}" xmlns="http://www.w3.org/2000/svg">\n'
+    '  <g id="Single_Clipped_Layer">\n'
+)
+
+
+def _svg_open_tag(width, height, profile: str, extra_attrs: str = "") -> str:
+    return _SVG_OPEN_TAG.format(w=width, h=height, profile=profile, extra=extra_attrs)
 
 
 def _layer_group_markup(
@@ -178,10 +263,19 @@ def _layer_group_markup(
     preserve_original_colors: bool,
 ) -> str:
     lines = [f'  <g id="{layer_name}">']
-    for shape_id in shape_ids:
-        shape = shapes[shape_id]
-        fill = get_shape_fill(shape, fallback_color=fill_color) if preserve_original_colors else fill_color
-        markup = shape_element_markup(shape, fill, path_precision)
+    # Quote each distinct fill once; a layer usually repeats a handful of colors.
+    layer_fill = _attr(fill_color)
+    quoted_fills = {fill_color: layer_fill}
+    layer_shapes = [shapes[shape_id] for shape_id in shape_ids]
+    path_ds = _generated_path_ds(layer_shapes, path_precision)
+    for shape, path_d in zip(layer_shapes, path_ds):
+        quoted_fill = layer_fill
+        if preserve_original_colors:
+            fill = get_shape_fill(shape, fallback_color=fill_color)
+            quoted_fill = quoted_fills.get(fill)
+            if quoted_fill is None:
+                quoted_fill = quoted_fills[fill] = _attr(fill)
+        markup = _shape_markup(shape, quoted_fill, path_precision, path_d)
         if markup:
             lines.append(f"    {markup}")
     lines.append("  </g>")
@@ -197,12 +291,28 @@ def build_layered_svg_string(
     export_profile: str = "Illustrator-safe",
 ) -> str:
     """Build the full layered SVG document, one <g> group per layer."""
+    return "".join(
+        _layered_svg_parts(
+            shapes, coloring, svg_width, svg_height, preserve_original_colors, export_profile
+        )
+    )
+
+
+def _layered_svg_parts(
+    shapes: List[Shape],
+    coloring: Dict[int, List[int]],
+    svg_width: float,
+    svg_height: float,
+    preserve_original_colors: bool,
+    export_profile: str,
+) -> Iterator[str]:
+    """The layered SVG document in order, one chunk per layer group."""
     profile, path_precision, include_crop_marks = resolve_export_profile(export_profile)
     color_map = build_layer_color_map(coloring.keys())
 
-    body = ""
+    yield _svg_open_tag(svg_width, svg_height, profile)
     for color_id in sorted(coloring.keys()):
-        body += _layer_group_markup(
+        yield _layer_group_markup(
             shapes,
             coloring[color_id],
             layer_name=f"Layer_Color_{color_id}",
@@ -210,11 +320,48 @@ def build_layered_svg_string(
             path_precision=path_precision,
             preserve_original_colors=preserve_original_colors,
         )
-
     if include_crop_marks:
-        body += f'  <g id="Crop_Marks">\n{generate_crop_marks_svg(svg_width, svg_height)}\n  </g>\n'
+        yield _crop_marks_group(svg_width, svg_height)
+    yield "</svg>\n"
+
+
+def _crop_marks_group(svg_width: float, svg_height: float) -> str:
+    return f'  <g id="Crop_Marks">\n{generate_crop_marks_svg(svg_width, svg_height)}\n  </g>\n'
 
-    return _svg_document(svg_width, svg_height, body, profile)
+
+def _current_umask() -> int:
+    # os.umask can only be read by setting it; restore it right away.
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def _write_parts_atomically(filepath: str, parts: Iterable[str]) -> None:
+    """
+    Stream parts into a temporary file beside filepath, then move it into
+    place. If generating the parts fails midway, an existing file at
+    filepath is left untouched and no half-written SVG remains.
+    """
+    temp = tempfile.NamedTemporaryFile(
+        "w",
+        encoding="utf-8",
+        dir=os.path.dirname(os.path.abspath(filepath)),
+        prefix=f".{os.path.basename(filepath)}.",
+        suffix=".tmp",
+        delete=False,
+    )
+    try:
+        with temp:
+            temp.writelines(parts)
+        # Temporary files are private (0600); give the export normal permissions.
+        os.chmod(temp.name, 0o666 & ~_current_umask())
+        os.replace(temp.name, filepath)
+    except BaseException:
+        try:
+            os.unlink(temp.name)
+        except OSError:
+            pass
+        raise
 
 
 def save_layers_to_files(
@@ -231,15 +378,12 @@ def save_layers_to_files(
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    content = build_layered_svg_string(
-        shapes, coloring, svg_width, svg_height,
-        preserve_original_colors=preserve_original_colors,
-        export_profile=export_profile,
-    )
-
     output_filepath = os.path.join(output_dir, f"{original_filename}_layered.svg")
-    with open(output_filepath, "w", encoding="utf-8") as f:
-        f.write(content)
+    # Streamed layer by layer: the whole document never sits in memory at once.
+    _write_parts_atomically(
+        output_filepath,
+        _layered_svg_parts(shapes, coloring, svg_width, svg_height, preserve_original_colors, export_profile),
+    )
 
     print(f"Layered SVG saved to: {output_filepath}")
     return output_filepath
@@ -266,6 +410,8 @@ def save_layers_to_separate_files(
     color_map = build_layer_color_map(coloring.keys())
     sorted_color_ids = sorted(coloring.keys())
     total = len(sorted_color_ids)
+    # Identical in every file, so built once.
+    crop_marks = _crop_marks_group(svg_width, svg_height) if include_crop_marks else ""
 
     written = []
     for position, color_id in enumerate(sorted_color_ids, start=1):
@@ -277,13 +423,14 @@ def save_layers_to_separate_files(
             path_precision=path_precision,
             preserve_original_colors=preserve_original_colors,
         )
-        if include_crop_marks:
-            body += f'  <g id="Crop_Marks">\n{generate_crop_marks_svg(svg_width, svg_height)}\n  </g>\n'
 
         filepath = os.path.join(output_dir, f"{original_filename}_layer_{position}of{total}.svg")
         extra = f' data-layer="{position}" data-layer-total="{total}"'
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(_svg_document(svg_width, svg_height, body, profile, extra_attrs=extra))
+        # Written piecewise so the layer body is never copied into a document string.
+        _write_parts_atomically(
+            filepath,
+            (_svg_open_tag(svg_width, svg_height, profile, extra_attrs=extra), body, crop_marks, "</svg>\n"),
+        )
         written.append(filepath)
 
     print(f"{total} layer files saved to: {output_dir}")
@@ -295,22 +442,17 @@ def save_single_layer_file(shapes: List[Shape], output_filepath: str, svg_width:
     Save all processed shapes into one single SVG layer.
     Useful for exporting clipped-visible results as one flat layer.
     """
-    lines = [
-        f'<svg width="{svg_width}" height="{svg_height}" viewBox="0 0 {svg_width} {svg_height}" '
-        'xmlns="http://www.w3.org/2000/svg">',
-        '  <g id="Single_Clipped_Layer">',
-    ]
+    parts = [_SINGLE_LAYER_HEADER.format(w=svg_width, h=svg_height)]
 
-    for shape in shapes:
+    for shape, path_d in zip(shapes, _generated_path_ds(shapes, 3)):
         fill = get_shape_fill(shape, fallback_color="#000000")
-        markup = shape_element_markup(shape, fill)
+        markup = _shape_markup(shape, _attr(fill), 3, path_d)
         if markup:
-            lines.append(f"    {markup}")
+            parts.append(f"    {markup}\n")
 
-    lines.extend(["  </g>", "</svg>", ""])
+    parts.append("  </g>\n</svg>\n")
 
-    with open(output_filepath, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+    _write_parts_atomically(output_filepath, parts)
 
     print(f"Single layer SVG saved to: {output_filepath}")
     return output_filepath
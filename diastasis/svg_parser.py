@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Tuple
+from typing import IO, Dict, List, Optional, Tuple, Union
 from lxml import etree
 import numpy as np
 from shapely.geometry import GeometryCollection, MultiPolygon, Polygon, Point, box
@@ -19,6 +19,9 @@ class Shape:
         # Original element tag/attrs for lossless export, valid only while
         # the geometry is untouched (pipelines that alter geometry drop it).
         self.native_shape = native_shape
+        # (geometry, precision, path data) from the last generated-path export,
+        # so repeated exports of an unchanged geometry skip re-emission.
+        self._d_cache = None
 
 class SVGParser:
     # Points sampled per curved segment (Bezier/arc) when polygonizing paths.
@@ -30,8 +33,8 @@ class SVGParser:
         # the fill area grown by half the (inherited) stroke width.
         self.include_strokes = include_strokes
 
-    def load_svg(self, filepath: str) -> Tuple[List[Shape], float, float]:
-        """Loads an SVG file and extracts shapes and dimensions."""
+    def load_svg(self, filepath: Union[str, IO[bytes]]) -> Tuple[List[Shape], float, float]:
+        """Loads an SVG file (path or binary file object) and extracts shapes and dimensions."""
         tree = etree.parse(filepath)
         root = tree.getroot()
         shapes = self.extract_shapes(root)
@@ -1,7 +1,11 @@
+import numpy as np
 import pytest
-from diastasis.geometry_engine import GeometryEngine
+import shapely
+from shapely.geometry import Point, Polygon, box
+
+from diastasis.geometry_engine import GeometryEngine, _upper_triangle_chunks
 from diastasis.svg_parser import Shape
-from shapely.geometry import Polygon, Point, box
+
 
 # Fixture for creating simple shapes
 @pytest.fixture
@@ -164,3 +168,191 @@ def test_count_candidate_pairs_matches_bbox_candidates(simple_shapes):
     assert vectorized_count == loop_count
     assert engine.count_candidate_pairs([]) == 0
     assert engine.count_candidate_pairs(simple_shapes[:1]) == 0
+
+
+def test_build_spatial_index_bulk_loads_and_handles_empty(simple_shapes):
+    engine = GeometryEngine(use_spatial_index=True)
+    engine.build_spatial_index(simple_shapes)
+    assert sorted(engine.idx.intersection((0, 0, 10, 10))) == [0, 1, 3]
+
+    engine.build_spatial_index([])
+    assert list(engine.idx.intersection((0, 0, 10, 10))) == []
+
+
+def test_parallel_overlap_detection_matches_vectorized():
+    engine = GeometryEngine(max_workers=2)
+    shapes = _random_shapes(60, 4)
+
+    parallel = {(i, j): area for i, j, area in engine.parallel_overlap_detection(shapes)}
+    vectorized = {(i, j): area for i, j, area in engine._detect_overlaps_vectorized(shapes)}
+
+    assert parallel.keys() == vectorized.keys()
+    for key, area in vectorized.items():
+        assert abs(parallel[key] - area) < 1e-9
+
+
+def test_bbox_filtered_pairs_drops_disjoint_boxes(simple_shapes):
+    engine = GeometryEngine(use_spatial_index=False)
+    left, right = engine._bbox_filtered_pairs(simple_shapes)
+    assert sorted(zip(left.tolist(), right.tolist())) == [(0, 1), (0, 3), (1, 3)]
+
+    left, right = engine._bbox_filtered_pairs(simple_shapes[:1])
+    assert left.size == 0 and right.size == 0
+
+
+def test_sanitize_geometry_repairs_each_geometry_once(monkeypatch):
+    engine = GeometryEngine(use_spatial_index=True)
+    bowtie = Polygon([(0, 0), (2, 2), (0, 2), (2, 0), (0, 0)])
+    shapes = [
+        Shape(id=0, geometry=bowtie, metadata={}),
+        Shape(id=1, geometry=box(0, 0, 1, 1), metadata={}),
+        Shape(id=2, geometry=box(1, 1, 2, 2), metadata={}),
+    ]
+    calls = []
+    original_repair = engine._repair_geometry
+    monkeypatch.setattr(engine, "_repair_geometry", lambda geom: calls.append(geom) or original_repair(geom))
+
+    engine._detect_contacts_pairwise(shapes, "edge_or_overlap")
+    engine._detect_overlaps_pairwise(shapes)
+
+    # Valid shapes are cleared by the batch check and never reach repair.
+    assert calls == [bowtie]
+    assert engine._sanitize_geometry(bowtie).is_valid
+
+
+def test_batch_validation_only_repairs_invalid_geometries(monkeypatch):
+    engine = GeometryEngine(use_spatial_index=True)
+    bowtie = Polygon([(0, 0), (2, 2), (0, 2), (2, 0), (0, 0)])
+    shapes = [
+        Shape(id=0, geometry=bowtie, metadata={}),
+        Shape(id=1, geometry=box(0, 0, 1, 1), metadata={}),
+    ]
+    calls = []
+    original_repair = engine._repair_geometry
+    monkeypatch.setattr(engine, "_repair_geometry", lambda geom: calls.append(geom) or original_repair(geom))
+
+    geometries = engine._sanitized_geometry_array(shapes)
+    engine._sanitized_geometry_array(shapes)
+
+    assert calls == [bowtie]
+    assert geometries[0].is_valid
+    assert geometries[1] is shapes[1].geometry
+
+
+@pytest.mark.parametrize("count, pairs_per_chunk", [(2, 1), (5, 3), (17, 7), (17, 1000)])
+def test_upper_triangle_chunks_cover_every_pair_once(count, pairs_per_chunk):
+    chunks = list(_upper_triangle_chunks(count, pairs_per_chunk))
+    left = np.concatenate([chunk_left for chunk_left, _ in chunks])
+    right = np.concatenate([chunk_right for _, chunk_right in chunks])
+    expected_left, expected_right = np.triu_indices(count, 1)
+    assert left.tolist() == expected_left.tolist()
+    assert right.tolist() == expected_right.tolist()
+
+
+def test_box_pairs_skip_geos_intersection(monkeypatch):
+    engine = GeometryEngine(use_spatial_index=True)
+    shapes = [
+        Shape(id=0, geometry=box(0, 0, 10, 10), metadata={}),
+        Shape(id=1, geometry=box(5, 5, 15, 15), metadata={}),
+        Shape(id=2, geometry=box(15, 5, 20, 15), metadata={}),  # edge touch with 1
+        Shape(id=3, geometry=box(20, 15, 25, 20), metadata={}),  # corner touch with 2
+    ]
+
+    def fail(*_args, **_kwargs):
+        raise AssertionError("GEOS intersection called for a rectangle pair")
+
+    monkeypatch.setattr(shapely, "intersection", fail)
+    assert engine._detect_overlaps_vectorized(shapes) == [(0, 1, 25.0)]
+    assert sorted(engine._detect_contacts_vectorized(shapes, "edge_or_overlap")) == [(0, 1), (1, 2)]
+
+
+def test_box_fast_path_ignores_non_rectangles():
+    engine = GeometryEngine(use_spatial_index=True)
+    holed = box(0, 0, 10, 10).difference(box(4, 4, 6, 6))
+    diamond = Polygon([(5, 0), (10, 5), (5, 10), (0, 5)])
+    shapes = [
+        Shape(id=0, geometry=holed, metadata={}),
+        Shape(id=1, geometry=box(3, 3, 7, 7), metadata={}),
+        Shape(id=2, geometry=diamond, metadata={}),
+    ]
+
+    vectorized = {(i, j): area for i, j, area in engine._detect_overlaps_vectorized(shapes)}
+    pairwise = {(i, j): area for i, j, area in engine._detect_overlaps_pairwise(shapes)}
+    assert vectorized.keys() == pairwise.keys()
+    for key, area in pairwise.items():
+        assert abs(vectorized[key] - area) < 1e-9
+
+
+@pytest.mark.parametrize("seed", [0, 5])
+def test_detect_overlap_pairs_match_overlap_areas(seed):
+    engine = GeometryEngine(use_spatial_index=True)
+    shapes = _random_shapes(80, seed) + [
+        Shape(id=1000, geometry=box(300, 300, 310, 310), metadata={}),
+        Shape(id=1001, geometry=Point(315, 305).buffer(5), metadata={}),  # tangent to 1000
+    ]
+
+    pairs = engine.detect_overlap_pairs(shapes)
+    assert sorted(pairs) == sorted((i, j) for i, j, _ in engine.detect_overlaps(shapes))
+
+
+def test_contact_classification_for_non_rectangles_matches_pairwise():
+    engine = GeometryEngine(use_spatial_index=True)
+    shapes = [
+        Shape(id=0, geometry=Polygon([(0, 0), (10, 0), (0, 10)]), metadata={}),
+        Shape(id=1, geometry=Polygon([(10, 0), (0, 10), (10, 10)]), metadata={}),  # shares hypotenuse
+        Shape(id=2, geometry=Polygon([(10, 10), (20, 10), (10, 20)]), metadata={}),  # corner with 1
+        Shape(id=3, geometry=Polygon([(5, 5), (15, 5), (5, 15)]), metadata={}),  # overlaps 0, 1, 2
+    ]
+
+    vectorized = sorted(engine._detect_contacts_vectorized(shapes, "edge_or_overlap"))
+    assert vectorized == sorted(engine._detect_contacts_pairwise(shapes, "edge_or_overlap"))
+    assert (0, 1) in vectorized
+    assert (1, 2) not in vectorized
+
+
+def test_candidate_pair_indices_are_sorted_and_unique():
+    engine = GeometryEngine(use_spatial_index=True)
+    shapes = [Shape(id=i, geometry=box(i, 0, i + 2.5, 1), metadata={}) for i in range(6)]
+
+    left, right = engine._candidate_pair_indices(shapes)
+    pairs = list(zip(left.tolist(), right.tolist()))
+
+    assert pairs == sorted(set(pairs))
+    assert pairs == [(i, j) for i in range(6) for j in range(i + 1, min(i + 3, 6))]
+
+
+def test_overlaps_ignore_disjoint_shapes_with_overlapping_bounds():
+    engine = GeometryEngine(use_spatial_index=True)
+    shapes = [
+        Shape(id=0, geometry=Polygon([(0, 0), (10, 0), (0, 10)]), metadata={}),
+        Shape(id=1, geometry=Polygon([(10, 10), (10, 4), (4, 10)]), metadata={}),
+    ]
+
+    assert engine.detect_overlaps(shapes) == []
+    assert engine.detect_overlap_pairs(shapes) == []
+    assert engine.count_candidate_pairs(shapes) == 1
+
+
+def test_rtree_properties_scale_with_input_and_accept_overrides(simple_shapes):
+    engine = GeometryEngine(use_spatial_index=True)
+    assert engine._rtree_property(10).leaf_capacity == 16
+    assert engine._rtree_property(GeometryEngine.SMALL_INDEX_SHAPES + 1).leaf_capacity == 64
+
+    tuned = GeometryEngine(use_spatial_index=True, rtree_properties={"leaf_capacity": 8, "index_capacity": 8})
+    properties = tuned._rtree_property(10)
+    assert (properties.leaf_capacity, properties.index_capacity) == (8, 8)
+    assert sorted(tuned.detect_overlaps(simple_shapes)) == sorted(engine.detect_overlaps(simple_shapes))
+
+
+def test_all_pairs_bbox_filter_matches_spatial_index_across_chunks():
+    # A 7-wide grid of 5x5 boxes on a 4-unit pitch: each overlaps its neighbors.
+    shapes = [
+        Shape(id=i, geometry=box(i % 7 * 4, i // 7 * 4, i % 7 * 4 + 5, i // 7 * 4 + 5), metadata={})
+        for i in range(30)
+    ]
+    indexed = GeometryEngine(use_spatial_index=True)._bbox_filtered_pairs(shapes)
+    all_pairs = GeometryEngine(use_spatial_index=False)
+    all_pairs.BBOX_FILTER_PAIRS_PER_CHUNK = 10  # Force many row blocks.
+    chunked = all_pairs._bbox_filtered_pairs(shapes)
+    assert chunked[0].tolist() == indexed[0].tolist()
+    assert chunked[1].tolist() == indexed[1].tolist()
@@ -1,8 +1,18 @@
-import pytest
+import random
+
 import networkx as nx
-from diastasis.graph_solver import GraphSolver
-from diastasis.svg_parser import Shape
+import numpy as np
+import pytest
 from shapely.geometry import box
+
+from diastasis.graph_solver import (
+    GraphSolver,
+    _force_k_assign,
+    _force_k_assign_loops,
+    _force_k_assign_numpy,
+)
+from diastasis.svg_parser import Shape
+
  # Assuming Shape class is available
 
 # Fixture for creating simple shapes (needed for build_overlap_graph)
@@ -177,6 +187,29 @@ def test_minimum_layers_colors_are_contiguous_from_zero():
     assert used_colors == set(range(len(used_colors)))
 
 
+def test_minimum_layers_reports_increasing_progress():
+    fractions = []
+    solver = GraphSolver()
+    solver.solve_coloring(
+        nx.mycielski_graph(4), algorithm="minimum_layers", progress_callback=fractions.append
+    )
+    assert fractions
+    assert fractions == sorted(fractions)
+    assert all(0 < fraction < 1 for fraction in fractions)
+
+
+def test_minimum_layers_reuses_given_lower_bound(monkeypatch):
+    solver = GraphSolver()
+    graph = nx.mycielski_graph(4)
+
+    def fail(graph):
+        raise AssertionError("clique search should be skipped")
+
+    monkeypatch.setattr(solver, "clique_lower_bound", fail)
+    coloring = solver.solve_coloring(graph, algorithm="minimum_layers", lower_bound=2)
+    assert solver.get_num_layers(coloring) == 4
+
+
 @pytest.mark.parametrize("seed", [0, 1, 2])
 def test_minimum_layers_never_worse_than_dsatur(seed):
     graph = nx.gnp_random_graph(40, 0.3, seed=seed)
@@ -201,3 +234,86 @@ def test_clique_lower_bound_finds_embedded_clique():
     graph.add_edges_from([(5, 10), (10, 11)])
     solver = GraphSolver()
     assert solver.clique_lower_bound(graph) == 6
+
+
+@pytest.mark.parametrize(
+    "graph",
+    [
+        nx.random_geometric_graph(400, 0.08, seed=3),  # sparse: Bron-Kerbosch
+        nx.gnp_random_graph(60, 0.5, seed=3),          # dense: branch and bound
+    ],
+)
+def test_clique_lower_bound_is_exact_max_clique(graph):
+    solver = GraphSolver()
+    clique_nodes, _ = nx.max_weight_clique(graph, weight=None)
+    assert solver.clique_lower_bound(graph) == len(clique_nodes)
+
+
+def test_force_k_coloring_avoids_heaviest_overlaps():
+    solver = GraphSolver()
+    graph = nx.Graph()
+    graph.add_node("a", size=3)
+    graph.add_node("b", size=2)
+    graph.add_node("c", size=1)
+    graph.add_edge("a", "b", weight=5.0)
+    graph.add_edge("b", "c", weight=1.0)
+    graph.add_edge("a", "c", weight=4.0)
+
+    coloring = solver.force_k_coloring(graph, k=2)
+
+    assert set(coloring) == {"a", "b", "c"}
+    assert all(isinstance(layer, int) for layer in coloring.values())
+    # a and b take separate layers; c joins b, the cheaper of the two.
+    assert coloring["a"] != coloring["b"]
+    assert coloring["c"] == coloring["b"]
+
+
+def test_to_csr_matches_graph_adjacency():
+    graph = nx.Graph()
+    graph.add_nodes_from(["x", "y", "z", "w"])
+    graph.add_edge("x", "y", weight=2.0)
+    graph.add_edge("y", "z")
+
+    indptr, indices, weights = GraphSolver()._to_csr(graph)
+
+    nodes = list(graph.nodes())
+    assert indptr.tolist() == [0, 1, 3, 4, 4]
+    for i, node in enumerate(nodes):
+        row = indices[indptr[i]:indptr[i + 1]].tolist()
+        assert sorted(nodes[j] for j in row) == sorted(graph.neighbors(node))
+    assert sorted(weights.tolist()) == [1.0, 1.0, 2.0, 2.0]
+
+
+def _reference_force_k(graph, order, k):
+    """Plain-Python force_k greedy straight from the graph, independent of the CSR kernels."""
+    nodes = list(graph.nodes())
+    layer_of = {}
+    for position in order:
+        node = nodes[position]
+        costs = [0.0] * k
+        for nbr, data in graph[node].items():
+            if nbr in layer_of:
+                costs[layer_of[nbr]] += data.get("weight", 1.0)
+        layer_of[node] = costs.index(min(costs))
+    return [layer_of[node] for node in nodes]
+
+
+@pytest.mark.parametrize("kernel", [_force_k_assign_numpy, _force_k_assign_loops, _force_k_assign])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_force_k_kernels_match_reference(kernel, seed):
+    graph = nx.gnp_random_graph(60, 0.2, seed=seed)
+    rng = random.Random(seed)
+    for u, v in graph.edges():
+        graph[u][v]["weight"] = rng.random()
+    indptr, indices, weights = GraphSolver()._to_csr(graph)
+    order = np.arange(graph.number_of_nodes(), dtype=np.int64)[::-1].copy()
+
+    expected = _reference_force_k(graph, order.tolist(), 3)
+    assert kernel(indptr, indices, weights, order, 3).tolist() == expected
+
+
+def test_normalize_colors_orders_classes_by_size():
+    solver = GraphSolver()
+    coloring = {"a": 7, "b": 3, "c": 7, "d": 5, "e": 3, "f": 7}
+    assert solver._normalize_colors(coloring) == {"a": 0, "b": 1, "c": 0, "d": 2, "e": 1, "f": 0}
+    assert solver._normalize_colors({}) == {}
@@ -0,0 +1,46 @@
+"""
+Headless checks of the GUI module's plain helpers. Skipped when tkinter
+or Pillow is not installed (e.g. in CI without the gui extras).
+"""
+import os
+
+import pytest
+
+pytest.importorskip("tkinter")
+pytest.importorskip("PIL.ImageTk")
+
+from diastasis.gui import _process_batch_file, _store_cache_entry  # noqa: E402
+
+
+def test_process_batch_file_reports_success_and_failure(tmp_path):
+    good = tmp_path / "good.svg"
+    good.write_text(
+        '<svg width="20" height="20" xmlns="http://www.w3.org/2000/svg">'
+        '<rect x="0" y="0" width="10" height="10" fill="#ff0000"/>'
+        '<rect x="5" y="5" width="10" height="10" fill="#00ff00"/>'
+        "</svg>"
+    )
+    bad = tmp_path / "bad.svg"
+    bad.write_text("<svg not xml")
+    output_dir = tmp_path / "out"
+    save_options = {"preserve_original_colors": False, "export_profile": "Web"}
+
+    assert _process_batch_file(str(good), str(output_dir), "flat", {}, save_options) is None
+    assert (output_dir / "good_flat_layered.svg").exists()
+
+    error = _process_batch_file(str(bad), str(output_dir), "flat", {}, save_options)
+    assert isinstance(error, str) and error
+
+
+def test_store_cache_entry_bounds_count_and_total_bytes(tmp_path):
+    for name in ("a", "b", "c", "d"):
+        path = tmp_path / f"{name}.png"
+        _store_cache_entry(str(tmp_path), str(path), b"x" * 100, max_files=3, max_bytes=250)
+        # Distinct, increasing mtimes regardless of filesystem timestamp resolution.
+        stamp = {"a": 1, "b": 2, "c": 3, "d": 4}[name] * 1_000_000_000
+        os.utime(path, ns=(stamp, stamp))
+    # 250 bytes hold only two 100-byte entries: the newest ones survive.
+    assert sorted(os.listdir(tmp_path)) == ["c.png", "d.png"]
+
+    _store_cache_entry(str(tmp_path), str(tmp_path / "big.png"), b"x" * 500, max_files=3, max_bytes=250)
+    assert os.listdir(tmp_path) == ["big.png"]
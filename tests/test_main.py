@@ -1,3 +1,6 @@
+import io
+
+import pytest
 from shapely.geometry import Polygon, box
 
 from diastasis.geometry_engine import GeometryEngine
@@ -6,6 +9,7 @@ from diastasis.main import (
     build_flat_conflict_graph,
     clip_shapes_to_visible_boundaries,
     estimate_processing_complexity,
+    flat_conflict_count,
     flat_layer_lower_bound,
     get_shape_fill,
     make_shapes_area_disjoint,
@@ -170,6 +174,18 @@ def test_clip_shapes_to_visible_boundaries_removes_occluded_regions():
     assert areas[1] == 100
 
 
+def test_clip_shapes_to_visible_boundaries_only_later_shapes_occlude():
+    shapes = [
+        Shape(id=0, geometry=box(0, 0, 10, 10), metadata={}),
+        Shape(id=1, geometry=box(5, 0, 15, 10), metadata={}),
+        Shape(id=2, geometry=box(100, 100, 101, 101), metadata={}),
+    ]
+
+    clipped = clip_shapes_to_visible_boundaries(shapes)
+    assert [shape.geometry.area for shape in clipped] == [50, 100, 1]
+    assert clipped[0].geometry.bounds == (0, 0, 5, 10)
+
+
 def test_run_diastasis_with_visible_clipping_disables_overlap(tmp_path):
     svg_content = """
     <svg width="40" height="40" xmlns="http://www.w3.org/2000/svg">
@@ -250,6 +266,7 @@ def test_estimate_processing_complexity_returns_metrics(tmp_path):
     assert estimate["all_pairs"] == 3
     assert estimate["complexity_label"] in {"Low", "Medium", "High", "Very High"}
     assert estimate["eta_seconds"] > 0
+    assert estimate_processing_complexity(io.BytesIO(svg_file.read_bytes())) == estimate
 
 
 def test_save_layers_to_files_web_profile_omits_crop_marks(tmp_path):
@@ -312,6 +329,27 @@ def test_run_diastasis_background_does_not_inflate_layer_count(tmp_path):
     assert len(grouped_coloring) == 3
     assert "Minimum proven required layers: 3" in summary
     assert "Layer count is provably optimal." in summary
+    # The GUI hands over the bytes it already read instead of the path.
+    assert run_diastasis(io.BytesIO(svg_file.read_bytes()), mode="overlaid")[2] == summary
+
+
+@pytest.mark.parametrize("mode", ["overlaid", "flat", "color"])
+def test_run_diastasis_reports_increasing_progress(tmp_path, mode):
+    svg_file = tmp_path / "progress.svg"
+    svg_file.write_text(
+        '<svg width="40" height="40" xmlns="http://www.w3.org/2000/svg">'
+        '<rect x="0" y="0" width="20" height="20" /><rect x="10" y="10" width="20" height="20" />'
+        "</svg>"
+    )
+    updates = []
+
+    run_diastasis(
+        str(svg_file), mode=mode, progress_callback=lambda stage, fraction: updates.append(fraction)
+    )
+
+    assert updates == sorted(updates)
+    assert updates[0] > 0
+    assert updates[-1] == 1.0
 
 
 def test_run_diastasis_flat_reports_optimal_layers(tmp_path):
@@ -373,6 +411,14 @@ def test_run_diastasis_recolors_rest_when_background_forced_separate(tmp_path):
     assert len(grouped_coloring[background_layers[0]]) == 1
 
 
+def test_flat_conflict_count_counts_same_layer_edges_once():
+    import networkx as nx
+
+    graph = nx.Graph([(0, 1), (1, 2), (2, 3), (3, 0)])
+    assert flat_conflict_count(graph, {0: 0, 1: 0, 2: 1, 3: 1}) == 2
+    assert flat_conflict_count(graph, {0: 0, 1: 1, 2: 0, 3: 1}) == 0
+
+
 def test_drop_sliver_fragments_removes_small_pieces():
     from diastasis.main import drop_sliver_fragments
     shapes = [
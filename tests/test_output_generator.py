@@ -51,6 +51,14 @@ def test_create_layer_files(tmp_path, simple_shapes, simple_coloring):
         assert "fill:rgb(" in content # Check for random color
         assert "<line x1=" in content # Check for registration marks
 
+def test_create_layer_files_is_deterministic(tmp_path, simple_shapes, simple_coloring):
+    generator = OutputGenerator()
+    generator.create_layer_files(simple_shapes, simple_coloring, str(tmp_path / "a"), "run")
+    generator.create_layer_files(simple_shapes, simple_coloring, str(tmp_path / "b"), "run")
+
+    for name in ("run_layer_1.svg", "run_layer_2.svg"):
+        assert (tmp_path / "a" / name).read_text() == (tmp_path / "b" / name).read_text()
+
 def test_generate_svg_layer(simple_shapes):
     generator = OutputGenerator()
     layer_color = "fill:rgb(100,100,100);"
@@ -74,6 +82,12 @@ def test_to_svg_path(simple_shapes):
     assert color in path_str
     assert 'id="s1"' in path_str
 
+def test_to_svg_path_escapes_source_attributes():
+    shape = Shape(id=0, geometry=box(0, 0, 1, 1), metadata={'style': 'fill:red;', 'id': 'a"<b>&c'})
+    path_str = OutputGenerator().to_svg_path(shape, "fill:rgb(0,0,0);")
+    assert "&lt;b&gt;&amp;c" in path_str
+    assert "<b>" not in path_str
+
 def test_add_registration_marks(simple_shapes):
     generator = OutputGenerator()
     marks = generator.add_registration_marks(simple_shapes, "my_layer")
@@ -1,7 +1,14 @@
-from shapely.geometry import box
+import os
 
+import pytest
+from shapely.geometry import GeometryCollection, LineString, MultiPolygon, Polygon, box
+
+from diastasis import svg_export
 from diastasis.main import run_diastasis
 from diastasis.svg_export import (
+    _generated_path_ds,
+    _polygon_path_ds,
+    polygon_to_svg_path_d,
     save_layers_to_files,
     save_layers_to_separate_files,
     shape_element_markup,
@@ -36,6 +43,45 @@ def test_shape_element_markup_falls_back_to_generated_path():
     assert 'fill-rule="evenodd"' in markup
 
 
+def test_polygon_to_svg_path_d_formats_every_ring():
+    donut = box(0, 0, 4, 4).difference(box(1, 1, 2, 2))
+    d = polygon_to_svg_path_d(donut, precision=1)
+    exterior, hole = (f"M {part.strip()}" for part in d.split("M ")[1:])
+
+    def ring(coords):
+        return "M " + " L ".join(f"{x:.1f} {y:.1f}" for x, y in coords) + " Z"
+
+    assert exterior == ring(donut.exterior.coords)
+    assert hole == ring(donut.interiors[0].coords)
+
+
+def test_batched_path_data_matches_per_polygon_output():
+    donut = box(0, 0, 4, 4).difference(box(1, 1, 2, 2))
+    geometries = [
+        donut,
+        None,
+        Polygon(),
+        LineString([(0, 0), (1, 1)]),
+        MultiPolygon([donut, box(10, 10, 11, 12)]),
+        GeometryCollection([box(5, 5, 6, 6), LineString([(0, 0), (1, 1)])]),
+    ]
+    expected = [polygon_to_svg_path_d(geometry, precision=2) for geometry in geometries]
+    assert _polygon_path_ds(geometries, precision=2) == expected
+    assert _polygon_path_ds([], precision=2) == []
+
+
+def test_generated_path_data_is_cached_until_geometry_changes():
+    shape = Shape(id=0, geometry=box(0, 0, 1, 1), metadata={})
+    first = _generated_path_ds([shape], 3)[0]
+    shape._d_cache = (shape.geometry, 3, "M cached Z")
+    assert _generated_path_ds([shape], 3) == ["M cached Z"]
+    # Another precision or a replaced geometry re-emits the path data.
+    assert _generated_path_ds([shape], 2) == [polygon_to_svg_path_d(shape.geometry, precision=2)]
+    shape.geometry = box(0, 0, 2, 2)
+    assert _generated_path_ds([shape], 3) == [polygon_to_svg_path_d(shape.geometry, precision=3)]
+    assert first == polygon_to_svg_path_d(box(0, 0, 1, 1), precision=3)
+
+
 def test_native_elements_survive_end_to_end_export(tmp_path):
     svg_content = """
     <svg width="100" height="100" xmlns="http://www.w3.org/2000/svg">
@@ -78,6 +124,35 @@ def test_save_layers_to_separate_files_registers_layers(tmp_path):
         assert 'id="Crop_Marks"' in content
 
 
+def test_save_layers_to_separate_files_keeps_layer_order(tmp_path):
+    shapes = [Shape(id=i, geometry=box(i, 0, i + 1, 1), metadata={}) for i in range(12)]
+    # Color ids out of order: checks that files are written in sorted color-id order.
+    coloring = {color_id: [color_id] for color_id in reversed(range(12))}
+
+    written = save_layers_to_separate_files(shapes, coloring, str(tmp_path), "job", 20, 20)
+
+    assert written == [str(tmp_path / f"job_layer_{position}of12.svg") for position in range(1, 13)]
+    for color_id, filepath in enumerate(written):
+        assert f'id="Layer_Color_{color_id}"' in open(filepath).read()
+
+
+def test_failed_export_leaves_existing_file_intact(tmp_path, monkeypatch):
+    target = tmp_path / "job_layered.svg"
+    target.write_text("previous export")
+
+    def failing_parts(*_args, **_kwargs):
+        yield "<svg>"
+        raise ValueError("bad geometry")
+
+    monkeypatch.setattr(svg_export, "_layered_svg_parts", failing_parts)
+    shapes = [Shape(id=0, geometry=box(0, 0, 1, 1), metadata={})]
+    with pytest.raises(ValueError):
+        save_layers_to_files(shapes, {0: [0]}, str(tmp_path), "job", 10, 10)
+
+    assert target.read_text() == "previous export"
+    assert os.listdir(tmp_path) == ["job_layered.svg"]
+
+
 def test_save_layers_to_separate_files_web_profile_omits_crop_marks(tmp_path):
     shapes = [Shape(id=0, geometry=box(0, 0, 10, 10), metadata={})]
     written = save_layers_to_separate_files(